@@ -0,0 +1,284 @@
+"""Dónde viven las hojas de la app: Google Sheets o archivos locales.
+
+Los dos almacenes exponen las mismas operaciones, con la semántica de una
+planilla: la fila 1 es el encabezado, las celdas son texto y las filas se
+numeran desde 1 (los índices para borrar cuentan desde 0, encabezado incluido,
+como en la API de Sheets).
+
+- leer(hoja): la hoja entera como DataFrame, con tipos inferidos. Las filas en
+  blanco no vienen, pero no corren la numeración: el índice es la posición de
+  cada fila en la hoja (la fila n de la planilla tiene índice n - 2).
+- encabezados(hoja), fila(hoja, n), filas_desde(hoja, n), columna(hoja, i).
+- escribir_encabezados(hoja, encabezados), agregar_filas(hoja, filas),
+  borrar_filas(hoja, indices).
+- marca(hoja): cambia cada vez que cambia el contenido.
+
+Escrituras concurrentes: quien escribe toma bloqueo(hoja), lee la marca como
+versión base, arma sus cambios con lecturas chicas (encabezados, una columna)
+y, si va a borrar filas o reescribir el encabezado, llama a
+verificar(hoja, base) justo antes de escribir. Si la hoja cambió desde la
+base, verificar levanta Conflicto sin haber escrito nada y los cambios se
+vuelven a armar sobre la versión nueva; escribir() hace todo el recorrido.
+Dentro de un proceso el bloqueo hace que las escrituras vayan de a una; la
+marca detecta lo que cambió desde afuera (otra instancia de la app, una
+edición a mano).
+
+AlmacenArchivos guarda cada hoja como CSV (o Parquet) en una carpeta: sirve
+para trabajar sin conexión en el taller, para probar sin credenciales de
+Google y como referencia de rendimiento para los benchmarks.
+"""
+import csv
+import os
+import re
+import threading
+from io import StringIO
+
+import pandas as pd
+
+import medicion
+
+REINTENTOS_ESCRITURA = 3
+
+
+class Conflicto(Exception):
+    """La hoja cambió desde la versión sobre la que se armó una escritura."""
+
+    def __init__(self, hoja, base, actual):
+        super().__init__(f"La hoja {hoja!r} cambió mientras se guardaba ({base} -> {actual})")
+        self.hoja = hoja
+        self.base = base
+        self.actual = actual
+
+
+def es_rechazo(error):
+    """True si el almacén rechazó el pedido en sí: un 4xx de la API de Sheets
+    (fila o rango inválido, hoja inexistente, sin permiso), salvo el 429 de
+    cuota. Repetir ese pedido igual da el mismo error. Cortes de red, timeouts,
+    cuota, 5xx y Conflicto son pasajeros.
+    """
+    try:
+        from gspread.exceptions import APIError
+    except ImportError:
+        return False
+    if not isinstance(error, APIError):
+        return False
+    estado = getattr(error.response, "status_code", None)
+    return estado is not None and 400 <= estado < 500 and estado != 429
+
+
+class _Almacen:
+    def verificar(self, hoja, base):
+        """Levanta Conflicto si la hoja ya no está en la versión `base`."""
+        actual = self.marca(hoja)
+        if actual != base:
+            raise Conflicto(hoja, base, actual)
+
+
+class AlmacenGSheets(_Almacen):
+    """Google Sheets a través de la conexión de Streamlit (st-gsheets-connection)."""
+
+    def __init__(self, conexion):
+        """`conexion`: función que devuelve la GSheetsConnection (st.connection la reutiliza)."""
+        self._conexion = conexion
+        self._hojas = {}
+        self._lock = threading.Lock()
+        # La marca es del libro entero: las escrituras del libro van de a una
+        self._escritura = threading.RLock()
+
+    def _hoja(self, hoja):
+        # Abrir la hoja pide sus metadatos a la API: se hace una vez por hoja
+        with self._lock:
+            if hoja not in self._hojas:
+                self._hojas[hoja] = self._conexion().client._select_worksheet(worksheet=hoja)
+            return self._hojas[hoja]
+
+    def bloqueo(self, hoja):
+        return self._escritura
+
+    def leer(self, hoja):
+        return self._conexion().read(worksheet=hoja, ttl=0)
+
+    def encabezados(self, hoja):
+        return self._hoja(hoja).row_values(1)
+
+    def fila(self, hoja, n):
+        return self._hoja(hoja).row_values(n)
+
+    def filas_desde(self, hoja, n):
+        return [list(f) for f in self._hoja(hoja).get(f"A{n}:ZZZ")]
+
+    def columna(self, hoja, indice):
+        return self._hoja(hoja).col_values(indice + 1)
+
+    def escribir_encabezados(self, hoja, encabezados):
+        h = self._hoja(hoja)
+        # update() no agranda la grilla: una columna de más daría "exceeds grid limits"
+        if len(encabezados) > h.col_count:
+            h.add_cols(len(encabezados) - h.col_count)
+        h.update(range_name="A1", values=[encabezados])
+
+    def agregar_filas(self, hoja, filas):
+        # Sheets agrega después de la tabla que empieza en A1, que termina en la
+        # primera fila en blanco: con INSERT_ROWS las filas nuevas se insertan
+        # ahí en vez de pisar lo que sigue al hueco
+        self._hoja(hoja).append_rows(filas, value_input_option="USER_ENTERED", insert_data_option="INSERT_ROWS",
+                                     table_range="A1")
+
+    def borrar_filas(self, hoja, indices):
+        """Borra en un único batch_update, de abajo hacia arriba para que los índices no se corran."""
+        h = self._hoja(hoja)
+        pedidos = [
+            {"deleteDimension": {"range": {"sheetId": h.id, "dimension": "ROWS", "startIndex": i, "endIndex": i + 1}}}
+            for i in sorted(indices, reverse=True)
+        ]
+        h.spreadsheet.batch_update({"requests": pedidos})
+
+    def marca(self, hoja):
+        # Fecha de modificación del archivo en Drive: no gasta cuota de Sheets
+        return self._hoja(hoja).spreadsheet.get_lastUpdateTime()
+
+
+class AlmacenArchivos(_Almacen):
+    """Una hoja por archivo en `carpeta`: <hoja>.csv o <hoja>.parquet.
+
+    En CSV agregar filas es un append al final del archivo; en Parquet (lectura
+    más rápida) cada escritura reescribe la hoja. Las reescrituras pasan por un
+    archivo temporal y os.replace, así que una lectura nunca ve media hoja.
+    El bloqueo de escritura es del proceso: una carpeta, una instancia de la app.
+    """
+
+    def __init__(self, carpeta, formato="csv"):
+        if formato not in ("csv", "parquet"):
+            raise ValueError(f"Formato de almacén desconocido: {formato!r} (csv o parquet)")
+        self.carpeta = carpeta
+        self.formato = formato
+        self._lock = threading.RLock()
+        os.makedirs(carpeta, exist_ok=True)
+
+    def ruta(self, hoja):
+        nombre = re.sub(r"[^\w\-]", "_", hoja)
+        return os.path.join(self.carpeta, f"{nombre}.{self.formato}")
+
+    def bloqueo(self, hoja):
+        return self._lock
+
+    # Lectura y escritura de las filas crudas (texto, encabezado incluido)
+
+    def _filas(self, hoja):
+        ruta = self.ruta(hoja)
+        if not os.path.exists(ruta):
+            return []
+        if self.formato == "parquet":
+            df = pd.read_parquet(ruta)
+            return [list(df.columns)] + df.astype(str).values.tolist()
+        with open(ruta, newline="", encoding="utf-8") as f:
+            return [fila for fila in csv.reader(f)]
+
+    def _reescribir(self, hoja, filas):
+        ruta = self.ruta(hoja)
+        temporal = f"{ruta}.tmp"
+        if self.formato == "parquet":
+            encabezados = filas[0] if filas else []
+            cuerpo = [f + [""] * (len(encabezados) - len(f)) for f in filas[1:]]
+            pd.DataFrame(cuerpo, columns=encabezados, dtype=str).to_parquet(temporal, index=False)
+        else:
+            with open(temporal, "w", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows(filas)
+        os.replace(temporal, ruta)
+
+    # Operaciones del almacén
+
+    def leer(self, hoja):
+        ruta = self.ruta(hoja)
+        if not os.path.exists(ruta):
+            return pd.DataFrame()
+        with self._lock:
+            if self.formato == "parquet":
+                ruta = StringIO(pd.read_parquet(ruta).to_csv(index=False))
+            # Como get_as_dataframe: sin las filas en blanco, con la posición de las demás
+            return pd.read_csv(ruta, skip_blank_lines=False).dropna(how="all")
+
+    def encabezados(self, hoja):
+        return self.fila(hoja, 1)
+
+    def fila(self, hoja, n):
+        with self._lock:
+            filas = self._filas(hoja)
+        return list(filas[n - 1]) if len(filas) >= n else []
+
+    def filas_desde(self, hoja, n):
+        with self._lock:
+            return self._filas(hoja)[n - 1:]
+
+    def columna(self, hoja, indice):
+        with self._lock:
+            return [f[indice] if len(f) > indice else "" for f in self._filas(hoja)]
+
+    def escribir_encabezados(self, hoja, encabezados):
+        with self._lock:
+            filas = self._filas(hoja)
+            self._reescribir(hoja, [list(encabezados)] + filas[1:])
+
+    def agregar_filas(self, hoja, filas):
+        filas = [["" if v is None else str(v) for v in fila] for fila in filas]
+        with self._lock:
+            if self.formato == "csv" and os.path.exists(self.ruta(hoja)):
+                with open(self.ruta(hoja), "a", newline="", encoding="utf-8") as f:
+                    csv.writer(f).writerows(filas)
+            else:
+                self._reescribir(hoja, self._filas(hoja) + filas)
+
+    def borrar_filas(self, hoja, indices):
+        borrar = set(indices)
+        with self._lock:
+            filas = self._filas(hoja)
+            self._reescribir(hoja, [f for i, f in enumerate(filas) if i not in borrar])
+
+    def marca(self, hoja):
+        try:
+            info = os.stat(self.ruta(hoja))
+        except FileNotFoundError:
+            return None
+        return f"{info.st_mtime_ns}-{info.st_size}"
+
+
+def escribir(almacen, hoja, armar, reintentos=REINTENTOS_ESCRITURA):
+    """Arma y aplica una escritura sobre la versión actual de la hoja.
+
+    `armar(almacen)` lee lo justo (encabezados, alguna columna) y devuelve los
+    cambios: {"encabezados": lista o None, "borrar": índices, "agregar": filas}.
+    Si los cambios borran filas o reescriben el encabezado, antes de escribir
+    se verifica que la hoja siga en la versión leída al empezar: si otro la
+    cambió en el medio no se escribe nada y se vuelve a armar sobre la versión
+    nueva (lo ajeno queda, lo propio se aplica encima), hasta `reintentos`
+    veces; después se levanta el Conflicto. Un append solo no se verifica: no
+    depende de nada leído y no pisa lo ajeno, y la marca es del libro entero
+    (una edición a mano en otra hoja daría conflictos que no son). Ninguna
+    vuelta relee la hoja entera. Devuelve los cambios aplicados.
+    """
+    for intento in range(1, reintentos + 1):
+        with almacen.bloqueo(hoja), medicion.tramo("escritura", hoja) as datos:
+            datos["intento"] = intento
+            try:
+                base = almacen.marca(hoja)
+            except Exception:
+                # Sin marca (p. ej. sin acceso a Drive) queda el bloqueo del proceso
+                base = None
+            cambios = armar(almacen)
+            if base is not None and (cambios["borrar"] or cambios["encabezados"]):
+                try:
+                    almacen.verificar(hoja, base)
+                except Conflicto:
+                    datos["resultado"] = "conflicto"
+                    if intento == reintentos:
+                        raise
+                    continue
+            datos["resultado"] = "ok"
+
+            if cambios["encabezados"]:
+                almacen.escribir_encabezados(hoja, cambios["encabezados"])
+            if cambios["borrar"]:
+                almacen.borrar_filas(hoja, cambios["borrar"])
+            if cambios["agregar"]:
+                almacen.agregar_filas(hoja, cambios["agregar"])
+            return cambios
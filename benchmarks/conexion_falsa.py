@@ -0,0 +1,117 @@
+"""Doble local de GSheetsConnection para los benchmarks.
+
+Implementa lo que usa tarjetas.py: `read()` de la conexión y, a través de
+`client._select_worksheet()`, las llamadas de gspread sobre la hoja
+(row_values, col_values, get, update, append_rows, add_cols, batch_update y la
+fecha de modificación). Cada llamada se cuenta en `llamadas` para comparar
+cuánto le pide cada modo al backend.
+"""
+import re
+from collections import Counter
+from io import StringIO
+
+import pandas as pd
+
+
+class _Planilla:
+    def __init__(self, libro):
+        self.libro = libro
+
+    def get_lastUpdateTime(self):
+        self.libro.contar("drive_last_update")
+        return str(self.libro.marca)
+
+    def batch_update(self, cuerpo):
+        self.libro.contar("batch_update")
+        for pedido in cuerpo.get("requests", []):
+            rango = pedido["deleteDimension"]["range"]
+            hoja = next(h for h in self.libro.hojas.values() if h.id == rango["sheetId"])
+            del hoja.filas[rango["startIndex"]:rango["endIndex"]]
+        self.libro.marca += 1
+
+
+class HojaFalsa:
+    """Worksheet de gspread en memoria: filas de texto, la primera es el encabezado."""
+
+    def __init__(self, titulo, filas, libro, id_hoja):
+        self.title = titulo
+        self.filas = filas
+        self.id = id_hoja
+        self.libro = libro
+        self.spreadsheet = libro.planilla
+        # Como una hoja nueva de Sheets: 26 columnas, o las del encabezado si son más
+        self.col_count = max(26, len(filas[0]) if filas else 0)
+
+    def row_values(self, fila):
+        self.libro.contar("row_values")
+        return list(self.filas[fila - 1]) if len(self.filas) >= fila else []
+
+    def col_values(self, columna):
+        self.libro.contar("col_values")
+        return [f[columna - 1] if len(f) >= columna else "" for f in self.filas]
+
+    def get(self, rango):
+        self.libro.contar("get")
+        desde = int(re.match(r"A(\d+)", rango).group(1))
+        return [list(f) for f in self.filas[desde - 1:]]
+
+    def update(self, range_name=None, values=None, **_):
+        self.libro.contar("update")
+        if len(values[0]) > self.col_count:
+            raise ValueError(f"Range ({self.title}!{range_name}) exceeds grid limits")
+        self.filas[0] = [str(v) for v in values[0]]
+        self.libro.marca += 1
+
+    def add_cols(self, cols):
+        self.libro.contar("add_cols")
+        self.col_count += cols
+        self.libro.marca += 1
+
+    def append_rows(self, values, insert_data_option=None, **_):
+        """Como values.append con table_range="A1": la tabla termina en la
+        primera fila en blanco y las filas van justo después, insertadas
+        (INSERT_ROWS) o pisando lo que haya (OVERWRITE, el valor por defecto)."""
+        self.libro.contar("append_rows")
+        nuevas = [["" if v is None else str(v) for v in fila] for fila in values]
+        fin = next((i for i, f in enumerate(self.filas) if not any(f)), len(self.filas))
+        if insert_data_option == "INSERT_ROWS":
+            self.filas[fin:fin] = nuevas
+        else:
+            self.filas[fin:fin + len(nuevas)] = nuevas
+        self.libro.marca += 1
+
+
+class _Cliente:
+    def __init__(self, libro):
+        self.libro = libro
+
+    def _select_worksheet(self, worksheet=None, **_):
+        return self.libro.hojas[worksheet or "Sheet1"]
+
+
+class ConexionFalsa:
+    """Reemplazo de `st.connection("gsheets", type=GSheetsConnection)`."""
+
+    def __init__(self, libro):
+        """`libro`: {worksheet: filas}, como lo arma datos_sinteticos.libro()."""
+        self.llamadas = Counter()
+        self.marca = 0
+        self.planilla = _Planilla(self)
+        self.hojas = {titulo: HojaFalsa(titulo, [list(f) for f in filas], self, i)
+                      for i, (titulo, filas) in enumerate(libro.items())}
+        self.client = _Cliente(self)
+
+    def contar(self, operacion):
+        self.llamadas[operacion] += 1
+
+    def read(self, worksheet=None, ttl=None, **_):
+        """Como GSheetsConnection.read: la hoja entera, con tipos inferidos por pandas."""
+        self.contar("read")
+        filas = self.hojas[worksheet or "Sheet1"].filas
+        if not filas:
+            return pd.DataFrame()
+        encabezado, cuerpo = filas[0], filas[1:]
+        texto = pd.DataFrame([f + [""] * (len(encabezado) - len(f)) for f in cuerpo], columns=encabezado)
+        # get_as_dataframe(drop_empty_rows=True): las filas en blanco no vienen y
+        # las demás conservan su posición en el índice
+        return pd.read_csv(StringIO(texto.to_csv(index=False)), skip_blank_lines=False).dropna(how="all")
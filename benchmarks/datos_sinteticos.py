@@ -0,0 +1,105 @@
+"""Hojas sintéticas de Sheet1 y Planificación para los benchmarks.
+
+Las filas vienen como texto, igual que las devuelve la API de Sheets, con una
+mezcla parecida a la real: muchos motores con pocas intervenciones y algunos
+con muchas, mayoría de relubricaciones y mediciones, rodamientos del catálogo
+(algunos sellados) y fechas de los últimos tres años.
+"""
+import random
+from datetime import date, timedelta
+
+ENCABEZADOS_SHEET1 = [
+    "Fecha", "Tag", "N_Serie", "Responsable", "Potencia", "Tension", "Corriente", "RPM",
+    "Carcasa", "Tipo_Tarea", "Rodamiento_LA", "Rodamiento_LOA", "Gramos_LA", "Gramos_LOA",
+    "Tipo_Grasa", "Descripcion", "Notas", "RT_TU", "RT_TV", "RT_TW", "RT_TU1", "RT_TV1", "RT_TW1",
+]
+ENCABEZADOS_PLAN = ["Fecha", "OT", "Motor", "Planta", "Inspector", "Encargado", "Tarea", "Prioridad", "Estado"]
+
+TAREAS = [("Relubricacion", 50), ("Mediciones de Campo", 25), ("Reparación", 15), ("Nuevo Registro", 10)]
+RODAMIENTOS = ["6205", "6206-2RS", "6208", "6210 C3", "6309", "6312", "6315", "6316 C3", "6319",
+               "22220", "NU215 ECP", "NU312", "6205ZZ", "7310BECBP"]
+RPMS = ["750", "1000", "1500", "1500", "1500", "3000"]
+POTENCIAS = ["5.5", "7.5", "11", "15", "22", "30", "45", "75", "110", "160", "250"]
+TECNICOS = ["Toledano Ruben", "Accordinaro Diego", "Ortega Enzo"]
+PLANTAS = ["PLANTA NORTE", "PLANTA SUR", "DESTILERIA", "ACEITERA", "BODEGA"]
+ESTADOS_OT = [("Pendiente", 30), ("En Proceso", 20), ("Finalizado", 50)]
+
+
+def _elegir(rnd, pesos):
+    return rnd.choices([v for v, _ in pesos], weights=[p for _, p in pesos])[0]
+
+
+def flota(n_motores, semilla=1):
+    """Datos de placa fijos por motor: (tag, serie, potencia, rpm, rod_la, rod_loa)."""
+    rnd = random.Random(semilla)
+    motores = []
+    for i in range(n_motores):
+        rod_la = rnd.choice(RODAMIENTOS)
+        motores.append((
+            f"{rnd.choice(['B', 'M', 'P', 'V'])}-{i:05d}",
+            f"{rnd.choice(['WEG', 'SIE', 'ABB'])}{100000 + i * 7}",
+            rnd.choice(POTENCIAS),
+            rnd.choice(RPMS),
+            rod_la,
+            rod_la if rnd.random() < 0.6 else rnd.choice(RODAMIENTOS),
+        ))
+    return motores
+
+
+def filas_sheet1(n_filas, semilla=1):
+    """Encabezado + `n_filas` intervenciones, en orden de carga (por fecha)."""
+    rnd = random.Random(semilla)
+    motores = flota(max(1, n_filas // 10), semilla)
+    # Pocos motores concentran muchas intervenciones (distribución de Pareto)
+    pesos = [1 / (k + 1) ** 0.8 for k in range(len(motores))]
+    elegidos = rnd.choices(motores, weights=pesos, k=n_filas)
+    inicio = date.today() - timedelta(days=3 * 365)
+    dias = sorted(rnd.randrange(3 * 365) for _ in range(n_filas))
+
+    filas = [list(ENCABEZADOS_SHEET1)]
+    for (tag, serie, pot, rpm, rod_la, rod_loa), d in zip(elegidos, dias):
+        tarea = _elegir(rnd, TAREAS)
+        fila = dict.fromkeys(ENCABEZADOS_SHEET1, "")
+        fila.update({
+            "Fecha": (inicio + timedelta(days=d)).strftime("%d/%m/%Y"),
+            "Tag": tag, "N_Serie": serie, "Responsable": rnd.choice(TECNICOS),
+            "Potencia": pot, "Tipo_Tarea": tarea,
+            "Rodamiento_LA": rod_la, "Rodamiento_LOA": rod_loa,
+        })
+        if tarea == "Relubricacion":
+            fila.update({"Gramos_LA": str(rnd.randint(5, 40)), "Gramos_LOA": str(rnd.randint(5, 30)),
+                         "Tipo_Grasa": "SKF LGHP 2", "Descripcion": "LUBRICACIÓN REALIZADA: SKF LGHP 2"})
+        elif tarea == "Mediciones de Campo":
+            fila.update({"RT_TU1": str(rnd.randint(200, 5000)), "RT_TV1": str(rnd.randint(200, 5000)),
+                         "RT_TW1": str(rnd.randint(200, 5000))})
+        else:
+            fila.update({"RPM": rpm, "Tension": "380", "Corriente": str(rnd.randint(5, 300)),
+                         "Carcasa": str(rnd.choice([132, 160, 200, 250, 315])),
+                         "RT_TU": str(rnd.randint(200, 5000)), "RT_TV": str(rnd.randint(200, 5000)),
+                         "RT_TW": str(rnd.randint(200, 5000)),
+                         "Descripcion": "Rebobinado y cambio de rodamientos"})
+        filas.append([fila[c] for c in ENCABEZADOS_SHEET1])
+    return filas
+
+
+def filas_plan(n_ots, motores, semilla=1):
+    """Encabezado + `n_ots` órdenes de trabajo sobre los motores de la flota."""
+    rnd = random.Random(semilla)
+    hoy = date.today()
+    filas = [list(ENCABEZADOS_PLAN)]
+    for i in range(n_ots):
+        tag, serie = rnd.choice(motores)[:2]
+        filas.append([
+            (hoy - timedelta(days=rnd.randrange(60))).strftime("%d/%m/%Y"),
+            f"OT{10000 + i}", f"{tag} | {serie}", rnd.choice(PLANTAS), "-",
+            rnd.choice(TECNICOS), rnd.choice(["Desarmar/Evaluar", "Armado"]),
+            rnd.choice(["Baja", "Normal", "Urgente"]), _elegir(rnd, ESTADOS_OT),
+        ])
+    return filas
+
+
+def libro(n_filas, semilla=1):
+    """{worksheet: filas} con Sheet1 de `n_filas` y una Planificación acorde."""
+    sheet1 = filas_sheet1(n_filas, semilla)
+    motores = flota(max(1, n_filas // 10), semilla)
+    return {"Sheet1": sheet1, "Planificación": filas_plan(max(50, n_filas // 20), motores, semilla)}
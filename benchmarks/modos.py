@@ -0,0 +1,193 @@
+"""Benchmark de los modos de tarjetas.py con hojas sintéticas.
+
+Para cada tamaño de Sheet1 arma un libro sintético, lo sirve con la conexión
+falsa (o, con --almacen archivos, desde CSV/Parquet locales) y recorre los
+modos con AppTest (sin navegador). Por modo mide:
+
+- primera: la primera pasada con las cachés vacías (lo que ve el primer
+  usuario después de un reinicio);
+- rerun: la pasada siguiente, con las cachés ya cargadas;
+- pico de memoria de Python (tracemalloc) durante la primera pasada;
+- operaciones del almacén de cada pasada (las que registra medicion.py).
+
+Los resultados se agregan a benchmarks/resultados.jsonl con el commit actual,
+y se comparan con la última medición de otro commit.
+
+    python benchmarks/modos.py [--filas 1000 10000 100000] [--modos "Historial y QR" ...]
+                               [--almacen gsheets|archivos] [--formato csv|parquet]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import almacenamiento  # noqa: E402
+import datos_sinteticos  # noqa: E402
+from conexion_falsa import ConexionFalsa  # noqa: E402
+
+APP = os.path.join(RAIZ, "tarjetas.py")
+RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados.jsonl")
+
+MODOS = ["Historial y QR", "Nuevo Registro", "Gestión de Reparaciónes", "Relubricacion", "Mediciones de Campo"]
+FILAS = [1000, 10000, 100000]
+
+
+def commit_actual():
+    try:
+        salida = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        sucio = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=RAIZ,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return salida + ("+cambios" if sucio else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def motor_con_mas_historia(libro):
+    """N_Serie con más intervenciones: el peor caso del historial."""
+    filas = libro["Sheet1"]
+    col = filas[0].index("N_Serie")
+    conteo = {}
+    for f in filas[1:]:
+        conteo[f[col]] = conteo.get(f[col], 0) + 1
+    return max(conteo, key=conteo.get)
+
+
+def pasada(at):
+    """Corre el script una vez: (ms, operaciones del almacén por nombre)."""
+    inicio = time.perf_counter()
+    at.run()
+    ms = (time.perf_counter() - inicio) * 1000
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    registro = at.session_state["_medicion_ultima"]
+    return ms, dict(Counter(t["nombre"] for t in registro.tramos if t["tipo"] == "backend"))
+
+
+def preparar_almacen(libro, almacen, formato, carpeta):
+    """Deja el libro donde lo va a leer la app, según el almacén elegido."""
+    if almacen == "archivos":
+        destino = tempfile.mkdtemp(dir=carpeta)
+        archivos = almacenamiento.AlmacenArchivos(destino, formato)
+        for hoja, filas in libro.items():
+            # Agregar a una hoja vacía: la primera fila queda como encabezado
+            archivos.agregar_filas(hoja, filas)
+        os.environ.update(MARPI_ALMACEN="archivos", MARPI_ALMACEN_DIR=destino, MARPI_ALMACEN_FORMATO=formato)
+    else:
+        conexion = ConexionFalsa(libro)
+        st.connection = lambda *a, **k: conexion
+        os.environ["MARPI_ALMACEN"] = "gsheets"
+
+
+def medir_modo(modo, libro, timeout, almacen="gsheets", formato="csv", carpeta=None):
+    """Primera pasada con cachés vacías y un rerun, sobre un libro recién armado."""
+    preparar_almacen(libro, almacen, formato, carpeta)
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    at.session_state["navegacion_actual"] = modo
+    at.session_state["autorizado"] = True
+    if modo == "Historial y QR":
+        at.query_params["serie"] = motor_con_mas_historia(libro)
+
+    tracemalloc.start()
+    primera_ms, llamadas_primera = pasada(at)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rerun_ms, llamadas_rerun = pasada(at)
+
+    return {
+        "primera_ms": round(primera_ms, 1),
+        "rerun_ms": round(rerun_ms, 1),
+        "pico_mb": round(pico / 2 ** 20, 1),
+        "llamadas_primera": llamadas_primera,
+        "llamadas_rerun": llamadas_rerun,
+    }
+
+
+def ultimas_de_otro_commit(commit, almacen):
+    """{(filas, modo): resultado} de la última corrida de un commit distinto con el mismo almacén."""
+    if not os.path.exists(RESULTADOS):
+        return {}
+    previos = {}
+    with open(RESULTADOS, encoding="utf-8") as f:
+        for linea in f:
+            r = json.loads(linea)
+            if r["commit"] != commit and r.get("almacen", "gsheets") == almacen:
+                previos[(r["filas"], r["modo"])] = r
+    return previos
+
+
+def _variacion(actual, previo):
+    if not previo:
+        return ""
+    return f" ({(actual - previo) / previo:+.0%})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, nargs="+", default=FILAS)
+    parser.add_argument("--modos", nargs="+", default=MODOS, choices=MODOS)
+    parser.add_argument("--almacen", choices=["gsheets", "archivos"], default="gsheets",
+                        help="gsheets: conexión falsa en memoria; archivos: AlmacenArchivos local")
+    parser.add_argument("--formato", choices=["csv", "parquet"], default="csv", help="formato con --almacen archivos")
+    parser.add_argument("--timeout", type=float, default=600, help="segundos por pasada de AppTest")
+    parser.add_argument("--no-guardar", action="store_true", help="no agregar a resultados.jsonl")
+    args = parser.parse_args()
+
+    # Los assets (logo, fuente) y la cola local se buscan relativos al directorio de trabajo
+    os.chdir(RAIZ)
+    commit = commit_actual()
+    almacen = args.almacen if args.almacen == "gsheets" else f"archivos-{args.formato}"
+    previos = ultimas_de_otro_commit(commit, almacen)
+    fecha = datetime.now().isoformat(timespec="seconds")
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        # Calentamiento: los imports diferidos (gspread, qrcode, fpdf) se pagan
+        # una vez por proceso y no deben cargarse a la primera medición
+        os.environ["MARPI_ESPEJO_DB"] = os.path.join(carpeta, "calentamiento.db")
+        medir_modo("Historial y QR", datos_sinteticos.libro(50), args.timeout, args.almacen, args.formato, carpeta)
+
+        resultados = []
+        for filas in args.filas:
+            libro = datos_sinteticos.libro(filas)
+            for modo in args.modos:
+                # Espejo SQLite propio por medición, para no arrastrar datos entre tamaños
+                os.environ["MARPI_ESPEJO_DB"] = os.path.join(carpeta, f"espejo_{filas}_{len(resultados)}.db")
+                r = {"commit": commit, "fecha": fecha, "almacen": almacen, "filas": filas, "modo": modo,
+                     **medir_modo(modo, libro, args.timeout, args.almacen, args.formato, carpeta)}
+                resultados.append(r)
+
+                previo = previos.get((filas, modo), {})
+                print(f"{filas:>7} filas | {modo:<24} | primera {r['primera_ms']:>8.0f} ms"
+                      f"{_variacion(r['primera_ms'], previo.get('primera_ms'))}"
+                      f" | rerun {r['rerun_ms']:>7.0f} ms{_variacion(r['rerun_ms'], previo.get('rerun_ms'))}"
+                      f" | pico {r['pico_mb']:>6.1f} MB"
+                      f" | almacén {sum(r['llamadas_primera'].values())}/{sum(r['llamadas_rerun'].values())}",
+                      flush=True)
+
+    if previos:
+        print(f"Variaciones contra el commit {next(iter(previos.values()))['commit']}")
+    if not args.no_guardar:
+        with open(RESULTADOS, "a", encoding="utf-8") as f:
+            for r in resultados:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        print(f"Resultados agregados a {os.path.relpath(RESULTADOS, RAIZ)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
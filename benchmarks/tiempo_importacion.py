@@ -0,0 +1,100 @@
+"""Presupuesto de tiempo de importación de la app.
+
+Corre en un intérprete limpio los imports de nivel módulo de tarjetas.py (y de
+los módulos propios que importa) con `python -X importtime`. El piso es lo que
+tarda `import streamlit, pandas`, que el worker paga igual; el presupuesto se
+aplica a lo que la app agrega encima. Falla si se pasa o si se cargó alguno de
+los módulos pesados que deben importarse recién al usarse.
+
+    python benchmarks/tiempo_importacion.py [--presupuesto-ms 100] [--repeticiones 5]
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = ["tarjetas.py", "etiquetas.py", "rodamientos.py"]
+
+# Se importan solo cuando corre la función que los usa
+DIFERIDOS = ["fpdf", "qrcode", "PIL", "requests", "streamlit_gsheets", "gspread"]
+
+# Milisegundos que la app puede sumar sobre el piso de streamlit + pandas
+PRESUPUESTO_MS = 100
+PISO = "import streamlit\nimport pandas"
+
+
+def imports_de_nivel_modulo(ruta):
+    """Sentencias import del nivel superior del archivo, tal como están escritas."""
+    with open(ruta, encoding="utf-8") as f:
+        fuente = f.read()
+    arbol = ast.parse(fuente)
+    return [ast.get_source_segment(fuente, nodo) for nodo in arbol.body
+            if isinstance(nodo, (ast.Import, ast.ImportFrom))]
+
+
+def medir_una_vez(codigo):
+    """(ms totales, módulos diferidos cargados) en un intérprete nuevo."""
+    sonda = codigo + "\nimport sys\nprint(','.join(m for m in %r if m in sys.modules))" % (DIFERIDOS,)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", sonda],
+        cwd=RAIZ, capture_output=True, text=True, check=True,
+    )
+    total_us = 0
+    for linea in proc.stderr.splitlines():
+        if not linea.startswith("import time:") or "|" not in linea:
+            continue
+        _, acumulado, nombre = linea.split("|")
+        # Solo los de primer nivel: su tiempo acumulado ya incluye a los hijos
+        if nombre.startswith(" ") and not nombre.startswith("  "):
+            try:
+                total_us += int(acumulado)
+            except ValueError:
+                pass
+    cargados = [m for m in proc.stdout.strip().split(",") if m]
+    return total_us / 1000, cargados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--presupuesto-ms", type=float,
+                        default=float(os.environ.get("MARPI_PRESUPUESTO_IMPORT_MS", PRESUPUESTO_MS)))
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    sentencias = []
+    for script in SCRIPTS:
+        for sentencia in imports_de_nivel_modulo(os.path.join(RAIZ, script)):
+            if sentencia not in sentencias:
+                sentencias.append(sentencia)
+    codigo = "\n".join(sentencias)
+
+    # Piso y app alternados, para que el ruido de la máquina afecte a los dos
+    tiempos, pisos, cargados = [], [], set()
+    for _ in range(args.repeticiones):
+        pisos.append(medir_una_vez(PISO)[0])
+        ms, diferidos = medir_una_vez(codigo)
+        tiempos.append(ms)
+        cargados.update(diferidos)
+
+    mediana, piso = statistics.median(tiempos), statistics.median(pisos)
+    extra = mediana - piso
+    print(f"imports de nivel módulo: mediana {mediana:.0f} ms "
+          f"(mín {min(tiempos):.0f}, máx {max(tiempos):.0f}, n={len(tiempos)})")
+    print(f"piso streamlit + pandas: {piso:.0f} ms; la app suma {extra:.0f} ms "
+          f"(presupuesto {args.presupuesto_ms:.0f} ms)")
+
+    fallas = []
+    if cargados:
+        fallas.append(f"se cargaron al arrancar: {', '.join(sorted(cargados))}")
+    if extra > args.presupuesto_ms:
+        fallas.append(f"{extra:.0f} ms supera el presupuesto de {args.presupuesto_ms:.0f} ms")
+    for falla in fallas:
+        print(f"FALLA: {falla}")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
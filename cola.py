@@ -0,0 +1,153 @@
+"""Cola local de envíos a las hojas.
+
+Los registros que se cargan en el taller (Relubricación, Mediciones) se guardan
+primero en disco y se mandan a la hoja después, en orden de llegada: así no se
+pierden aunque Google Sheets esté caído o el proceso se reinicie. Cada envío es
+un archivo JSON escrito con fsync y renombrado atómico.
+
+Un envío que la hoja rechaza (almacenamiento.es_rechazo) max_intentos veces
+seguidas se aparta en <carpeta>/rechazados para no frenar a los que vienen
+detrás. Cualquier otro error (sin conexión, timeout, cuota, Conflicto) deja la
+cola como está: se reintenta más tarde sin sumar intentos ni desordenar nada.
+"""
+import json
+import logging
+import os
+import time
+import uuid
+
+import almacenamiento
+
+log = logging.getLogger("marpi")
+
+MAX_INTENTOS = 5
+
+
+def _escribir_envio(ruta, registro):
+    """Escribe el envío con fsync y renombrado atómico."""
+    ruta_tmp = ruta + ".tmp"
+    with open(ruta_tmp, "w", encoding="utf-8") as f:
+        json.dump(registro, f, ensure_ascii=False, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(ruta_tmp, ruta)
+
+
+def _leer_envio(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class ColaEnvios:
+    """Envíos pendientes en `carpeta`, uno por archivo, ordenados por nombre.
+
+    `enviar(hoja, filas)` agrega las filas (dicts) a la hoja; `al_enviar(hoja)`
+    se llama después de cada lote que llegó (p. ej. para invalidar cachés).
+    """
+
+    def __init__(self, carpeta, enviar, al_enviar=None, max_intentos=MAX_INTENTOS):
+        self.carpeta = carpeta
+        self.rechazados_dir = os.path.join(carpeta, "rechazados")
+        self._enviar = enviar
+        self._al_enviar = al_enviar
+        self.max_intentos = max_intentos
+
+    def encolar(self, worksheet, fila):
+        """Guarda la fila en disco y devuelve el nombre del envío."""
+        os.makedirs(self.carpeta, exist_ok=True)
+        nombre = f"{time.time_ns()}_{uuid.uuid4().hex[:8]}.json"
+        _escribir_envio(os.path.join(self.carpeta, nombre), {"worksheet": worksheet, "fila": fila})
+        return nombre
+
+    def pendientes(self):
+        """Lista (en orden de llegada) los envíos que todavía no llegaron a la hoja."""
+        if not os.path.isdir(self.carpeta):
+            return []
+        return sorted(n for n in os.listdir(self.carpeta) if n.endswith(".json"))
+
+    def rechazados(self):
+        """Envíos apartados tras max_intentos rechazos, con el último error."""
+        if not os.path.isdir(self.rechazados_dir):
+            return []
+        return [{"nombre": n, **_leer_envio(os.path.join(self.rechazados_dir, n))}
+                for n in sorted(os.listdir(self.rechazados_dir)) if n.endswith(".json")]
+
+    def reintentar_rechazados(self):
+        """Devuelve los envíos rechazados a la cola, con los intentos en cero.
+
+        Conservan su nombre, así que vuelven a su lugar en el orden de llegada.
+        """
+        for registro in self.rechazados():
+            nombre = registro.pop("nombre")
+            registro.pop("intentos", None)
+            registro.pop("error", None)
+            _escribir_envio(os.path.join(self.carpeta, nombre), registro)
+            os.remove(os.path.join(self.rechazados_dir, nombre))
+
+    def _anotar_rechazo(self, nombre, error):
+        """Suma un rechazo al envío; al llegar a max_intentos lo aparta.
+
+        Devuelve True si el envío quedó en rechazados.
+        """
+        ruta = os.path.join(self.carpeta, nombre)
+        registro = _leer_envio(ruta)
+        registro["intentos"] = registro.get("intentos", 0) + 1
+        registro["error"] = str(error)
+        if registro["intentos"] < self.max_intentos:
+            _escribir_envio(ruta, registro)
+            return False
+        os.makedirs(self.rechazados_dir, exist_ok=True)
+        _escribir_envio(os.path.join(self.rechazados_dir, nombre), registro)
+        os.remove(ruta)
+        log.error("Cola de envíos: %s apartado en %s tras %d rechazos (%s)",
+                  nombre, self.rechazados_dir, registro["intentos"], error)
+        return True
+
+    def _enviar_lote(self, hoja, lote, filas):
+        """Manda el lote y devuelve los envíos que llegaron a la hoja.
+
+        Si la hoja rechaza el lote se prueba el primero solo, para saber si es
+        ese envío el rechazado (y anotárselo). Un error pasajero se propaga sin
+        tocar los intentos.
+        """
+        try:
+            self._enviar(hoja, filas)
+            return lote
+        except Exception as e:
+            if not almacenamiento.es_rechazo(e):
+                raise
+            if len(lote) > 1:
+                return self._enviar_lote(hoja, lote[:1], filas[:1])
+            if self._anotar_rechazo(lote[0], e):
+                return []
+            raise
+
+    def vaciar(self):
+        """Manda a la hoja los envíos pendientes, en lotes por hoja y en orden.
+
+        Si un lote falla se corta ahí, para no desordenar los registros; lo que
+        no se pudo enviar queda en disco para el próximo intento. Devuelve
+        cuántos envíos llegaron.
+        """
+        enviados = 0
+        pendientes = self.pendientes()
+        while pendientes:
+            hoja = _leer_envio(os.path.join(self.carpeta, pendientes[0]))["worksheet"]
+
+            lote, filas = [], []
+            for nombre in pendientes:
+                registro = _leer_envio(os.path.join(self.carpeta, nombre))
+                if registro["worksheet"] != hoja:
+                    break
+                lote.append(nombre)
+                filas.append(registro["fila"])
+
+            llegaron = self._enviar_lote(hoja, lote, filas)
+            for nombre in llegaron:
+                os.remove(os.path.join(self.carpeta, nombre))
+            if llegaron and self._al_enviar is not None:
+                self._al_enviar(hoja)
+            enviados += len(llegaron)
+            pendientes = self.pendientes()
+
+        return enviados
@@ -0,0 +1,97 @@
+"""Etiquetas Honeywell de MARPI.
+
+El dibujo no usa Streamlit, así puede correr en otros procesos (exportación en
+lote) además de en la app. qrcode, PIL y fpdf se importan recién al dibujar o
+exportar, para no sumarlos al arranque de la app.
+"""
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+import multiprocessing
+
+URL_APP = "https://marpi-motores-mciqbovz6wqnaj9mw7fytb.streamlit.app/"
+RUTA_FUENTE = "Arial-Bold.ttf"
+RUTA_LOGO = "logo.png"
+
+# Tamaño físico de la etiqueta (mm), el mismo que usa la impresión desde el historial
+ANCHO_MM, ALTO_MM = 60, 30
+# Etiquetas por tanda: acota los PNG que vuelven del pool a la vez. El PDF en
+# sí crece con cada etiqueta (fpdf guarda todas las imágenes hasta output())
+TANDA_PDF = 64
+
+
+def hay_fuente():
+    return os.path.exists(RUTA_FUENTE)
+
+
+@lru_cache(maxsize=1)
+def recursos():
+    """Fuente y logo, leídos del disco una sola vez por proceso."""
+    from PIL import Image, ImageFont
+
+    fuente = ImageFont.truetype(RUTA_FUENTE, 35) if hay_fuente() else ImageFont.load_default()
+    try:
+        logo = Image.open(RUTA_LOGO).convert('RGBA')
+        logo.thumbnail((250, 80), Image.Resampling.LANCZOS)
+    except Exception:
+        logo = None
+    return fuente, logo
+
+
+def etiqueta_png(serie):
+    """PNG (1 bit, 600x300) con el QR del motor, su N° de serie y el logo."""
+    import qrcode
+    from PIL import Image, ImageDraw
+
+    etiqueta = Image.new('RGB', (600, 300), (255, 255, 255))
+    draw = ImageDraw.Draw(etiqueta)
+
+    qr = qrcode.make(f"{URL_APP}?serie={serie}&exact=1")
+    # NEAREST: los módulos del QR quedan nítidos para el umbral a 1 bit
+    img_qr = qr.convert('RGB').resize((250, 250), Image.NEAREST)
+    etiqueta.paste(img_qr, (20, 25))
+
+    x_derecha = 300
+    fuente, logo = recursos()
+    draw.text((x_derecha + 10, 100), str(serie).upper(), font=fuente, fill=(0, 0, 0))
+
+    if logo is not None:
+        etiqueta.paste(logo, (x_derecha + 15, 20), logo)
+    else:
+        draw.text((x_derecha + 15, 20), "MARPI MOTORES", fill=(0, 0, 0))
+
+    etiqueta_final = etiqueta.convert('L').point(lambda x: 0 if x < 128 else 255, '1')
+
+    buf = BytesIO()
+    etiqueta_final.save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def exportar_pdf(series, procesos=None):
+    """PDF listo para imprimir con una etiqueta por página.
+
+    Las etiquetas se dibujan en paralelo en un pool de procesos y se agregan al
+    PDF por tandas de TANDA_PDF, pasando por archivos temporales. El documento
+    se arma entero en memoria: unos pocos KB por etiqueta.
+    """
+    from fpdf import FPDF
+
+    series = list(dict.fromkeys(str(s) for s in series))
+    pdf = FPDF(unit='mm', format=(ANCHO_MM, ALTO_MM))
+    pdf.set_auto_page_break(False)
+
+    # "spawn": la app corre con hilos propios y fork no es seguro en ese caso
+    contexto = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as carpeta, \
+            ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+        for inicio in range(0, len(series), TANDA_PDF):
+            tanda = series[inicio:inicio + TANDA_PDF]
+            for n, png in enumerate(pool.map(etiqueta_png, tanda), start=inicio):
+                ruta = os.path.join(carpeta, f"etiqueta_{n}.png")
+                with open(ruta, "wb") as f:
+                    f.write(png)
+                pdf.add_page()
+                pdf.image(ruta, x=0, y=0, w=ANCHO_MM, h=ALTO_MM)
+        return pdf.output(dest='S').encode('latin-1')
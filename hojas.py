@@ -0,0 +1,55 @@
+"""Limpieza de las hojas tal como llegan del almacén.
+
+Todo lo que lee la app pasa por normalizar_datos() una sola vez al cargar: los
+filtros y búsquedas de los modos trabajan sobre el resultado.
+"""
+import pandas as pd
+
+# Textos que en las hojas significan "sin dato"; al cargar pasan a ser nulos
+VALORES_NULOS = ["", "NAN", "NONE", "-", "S/D"]
+CLAVES_MOTOR = ["Tag", "N_Serie"]
+# Columnas que agrega la normalización y que no existen en la hoja
+COLUMNAS_DERIVADAS = ["Fecha_DT"]
+
+
+def _normalizar_claves(serie):
+    if pd.api.types.is_float_dtype(serie) and (serie.dropna() % 1 == 0).all():
+        # Series numéricas: 12345.0 -> "12345"
+        serie = serie.astype("Int64")
+    return serie.astype(str).str.strip().str.upper().where(serie.notna())
+
+
+def normalizar_datos(df):
+    """Deja una hoja lista para usar en todos los modos.
+
+    Los textos de "sin dato" pasan a nulos, Tag/N_Serie quedan limpios y en
+    mayúsculas, y Fecha se parsea una sola vez en Fecha_DT.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if col in COLUMNAS_DERIVADAS:
+            continue
+        if pd.api.types.is_string_dtype(df[col]) or pd.api.types.is_object_dtype(df[col]):
+            texto = df[col].astype(str).str.strip().str.upper()
+            df[col] = df[col].where(df[col].notna() & ~texto.isin(VALORES_NULOS))
+    for col in CLAVES_MOTOR:
+        if col in df.columns:
+            df[col] = _normalizar_claves(df[col])
+    if "Fecha" in df.columns:
+        df["Fecha_DT"] = pd.to_datetime(df["Fecha"], dayfirst=True, errors="coerce")
+    return df
+
+
+def normalizar_clave(valor):
+    return str(valor).strip().upper()
+
+
+def filas_a_dataframe(filas, base):
+    """Arma un DataFrame con las columnas y tipos de `base` a partir de filas crudas."""
+    columnas = [c for c in base.columns if c not in COLUMNAS_DERIVADAS]
+    df = pd.DataFrame([f + [""] * (len(columnas) - len(f)) for f in filas], columns=columnas)
+    df = df.where(df != "")
+    for col in columnas:
+        if pd.api.types.is_numeric_dtype(base[col]):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
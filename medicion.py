@@ -0,0 +1,204 @@
+"""Medición de cada rerun de la app: tramos de tiempo, conteos y perfil opcional.
+
+Un Registro junta lo que pasó en una ejecución del script: llamadas al backend,
+aciertos y fallos de caché, fases de dibujo y esperas. Cada tramo sale además
+como una línea JSON en el logger "marpi.medicion" (nivel con
+MARPI_LOG_MEDICION, por defecto INFO: solo el resumen de cada rerun; DEBUG
+agrega un renglón por tramo).
+
+El registro activo es por hilo: cada rerun de Streamlit corre en su propio
+hilo, y lo que se mide desde otros hilos (la cola de envíos) solo va al log.
+"""
+import io
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+log = logging.getLogger("marpi.medicion")
+if not log.handlers:
+    _salida = logging.StreamHandler()
+    _salida.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(_salida)
+    log.setLevel(os.environ.get("MARPI_LOG_MEDICION", "INFO").upper())
+    log.propagate = False
+
+# Llamadas que se cuentan como backend aunque se accedan a través de un atributo
+_ANIDADOS = ("client", "spreadsheet")
+# Métodos del backend que son locales (no hablan con el servicio)
+_LOCALES = ("bloqueo",)
+
+_hilo = threading.local()
+
+
+class Registro:
+    """Tramos y conteos de un rerun."""
+
+    def __init__(self, etiqueta="", perfilar=False):
+        self.id = uuid.uuid4().hex[:8]
+        self.etiqueta = etiqueta
+        self.tramos = []
+        self.conteos = Counter()
+        self.total_ms = None
+        self.interrumpido = False
+        self.perfil = None
+        self._inicio = time.perf_counter()
+        self._fase = None
+        self._perfilador = None
+        if perfilar:
+            import cProfile
+            self._perfilador = cProfile.Profile()
+            self._perfilador.enable()
+
+    @property
+    def cerrado(self):
+        return self.total_ms is not None
+
+    def agregar(self, tipo, nombre, ms, **datos):
+        tramo = {"tipo": tipo, "nombre": nombre, "ms": round(ms, 2), **datos}
+        self.tramos.append(tramo)
+        self.conteos[tipo] += 1
+        if "resultado" in datos:
+            self.conteos[f"{tipo}_{datos['resultado']}"] += 1
+        return tramo
+
+    def fase(self, nombre):
+        """Cierra la fase en curso (si hay) y empieza `nombre`."""
+        ahora = time.perf_counter()
+        if self._fase is not None:
+            anterior, desde = self._fase
+            _loguear(self, self.agregar("fase", anterior, (ahora - desde) * 1000), logging.DEBUG)
+        self._fase = (nombre, ahora) if nombre else None
+
+    def cerrar(self, interrumpido=False):
+        """Termina el rerun: cierra la fase abierta, el perfil y loguea el resumen.
+
+        `interrumpido` marca los reruns cortados por st.rerun(), que se cierran
+        recién al empezar el siguiente.
+        """
+        if self.cerrado:
+            return self
+        self.fase(None)
+        self.total_ms = round((time.perf_counter() - self._inicio) * 1000, 2)
+        self.interrumpido = interrumpido
+        if self._perfilador is not None:
+            import pstats
+            self._perfilador.disable()
+            texto = io.StringIO()
+            pstats.Stats(self._perfilador, stream=texto).sort_stats("cumulative").print_stats(30)
+            self.perfil = texto.getvalue()
+            self._perfilador = None
+        log.info(json.dumps({
+            "evento": "rerun", "rerun": self.id, "etiqueta": self.etiqueta, "ms": self.total_ms,
+            "interrumpido": interrumpido, "conteos": dict(self.conteos),
+            "perfil": self.perfil is not None,
+        }, ensure_ascii=False))
+        return self
+
+    def resumen(self):
+        """Tiempo total por (tipo, nombre), de mayor a menor."""
+        acumulado = {}
+        for t in self.tramos:
+            clave = (t["tipo"], t["nombre"])
+            ms, n = acumulado.get(clave, (0.0, 0))
+            acumulado[clave] = (ms + t["ms"], n + 1)
+        return sorted(((tipo, nombre, round(ms, 2), n) for (tipo, nombre), (ms, n) in acumulado.items()),
+                      key=lambda fila: -fila[2])
+
+
+def _loguear(registro, tramo, nivel):
+    if log.isEnabledFor(nivel):
+        log.log(nivel, json.dumps({"evento": "tramo", "rerun": registro.id if registro else None, **tramo},
+                                  ensure_ascii=False, default=str))
+
+
+def iniciar_rerun(etiqueta="", perfilar=False):
+    """Abre el registro del rerun que corre en este hilo."""
+    _hilo.registro = Registro(etiqueta, perfilar)
+    return _hilo.registro
+
+
+def actual():
+    return getattr(_hilo, "registro", None)
+
+
+def fase(nombre):
+    registro = actual()
+    if registro is not None:
+        registro.fase(nombre)
+
+
+@contextmanager
+def tramo(tipo, nombre):
+    """Mide el bloque. Se pueden agregar datos al tramo en el dict que devuelve."""
+    datos = {}
+    inicio = time.perf_counter()
+    try:
+        yield datos
+    finally:
+        ms = (time.perf_counter() - inicio) * 1000
+        registro = actual()
+        if registro is not None and not registro.cerrado:
+            _loguear(registro, registro.agregar(tipo, nombre, ms, **datos), logging.DEBUG)
+        else:
+            _loguear(None, {"tipo": tipo, "nombre": nombre, "ms": round(ms, 2), **datos}, logging.DEBUG)
+
+
+def cache(decorador):
+    """Aplica el decorador de caché de Streamlit midiendo cada llamada.
+
+    El cuerpo de la función solo corre en un fallo de caché: ahí se anota, y el
+    tramo queda con resultado "hit" o "miss".
+
+        @medicion.cache(st.cache_data(ttl=10))
+        def cargar_datos_google(): ...
+    """
+    def decorar(funcion):
+        @wraps(funcion)
+        def cuerpo(*args, **kwargs):
+            _hilo.fallos = getattr(_hilo, "fallos", 0) + 1
+            return funcion(*args, **kwargs)
+
+        cacheada = decorador(cuerpo)
+
+        @wraps(funcion)
+        def llamada(*args, **kwargs):
+            antes = getattr(_hilo, "fallos", 0)
+            with tramo("cache", funcion.__name__) as datos:
+                resultado = cacheada(*args, **kwargs)
+                datos["resultado"] = "miss" if getattr(_hilo, "fallos", 0) != antes else "hit"
+            return resultado
+
+        llamada.clear = cacheada.clear
+        return llamada
+    return decorar
+
+
+class _Medido:
+    """Envuelve un objeto del backend y mide cada método que se llama."""
+
+    def __init__(self, objeto, nombre):
+        self._objeto = objeto
+        self._nombre = nombre
+
+    def __getattr__(self, atributo):
+        valor = getattr(self._objeto, atributo)
+        if atributo in _ANIDADOS:
+            return _Medido(valor, f"{self._nombre}.{atributo}")
+        if not callable(valor) or atributo in _LOCALES:
+            return valor
+
+        @wraps(valor)
+        def llamada(*args, **kwargs):
+            with tramo("backend", f"{self._nombre}.{atributo}"):
+                return valor(*args, **kwargs)
+        return llamada
+
+
+def backend(objeto, nombre):
+    return _Medido(objeto, nombre)
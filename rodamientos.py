@@ -0,0 +1,290 @@
+"""Catálogo de rodamientos y cálculo de grasa de relubricación.
+
+El catálogo se arma una sola vez al importar el módulo; buscar un rodamiento es
+un acceso a dict. Para designaciones que no están en el catálogo se usa la
+estimación histórica de MARPI por serie y tamaño.
+"""
+import re
+
+import pandas as pd
+
+# Medidas (d, D, B) en mm por código base
+_SERIE_60 = {
+    "6000": (10, 26, 8), "6001": (12, 28, 8), "6002": (15, 32, 9), "6003": (17, 35, 10),
+    "6004": (20, 42, 12), "6005": (25, 47, 12), "6006": (30, 55, 13), "6007": (35, 62, 14),
+    "6008": (40, 68, 15), "6009": (45, 75, 16), "6010": (50, 80, 16), "6011": (55, 90, 18),
+    "6012": (60, 95, 18), "6013": (65, 100, 18), "6014": (70, 110, 20), "6015": (75, 115, 20),
+    "6016": (80, 125, 22), "6017": (85, 130, 22), "6018": (90, 140, 24), "6019": (95, 145, 24),
+    "6020": (100, 150, 24),
+}
+_SERIE_62 = {
+    "6200": (10, 30, 9), "6201": (12, 32, 10), "6202": (15, 35, 11), "6203": (17, 40, 12),
+    "6204": (20, 47, 14), "6205": (25, 52, 15), "6206": (30, 62, 16), "6207": (35, 72, 17),
+    "6208": (40, 80, 18), "6209": (45, 85, 19), "6210": (50, 90, 20), "6211": (55, 100, 21),
+    "6212": (60, 110, 22), "6213": (65, 120, 23), "6214": (70, 125, 24), "6215": (75, 130, 25),
+    "6216": (80, 140, 26), "6217": (85, 150, 28), "6218": (90, 160, 30), "6219": (95, 170, 32),
+    "6220": (100, 180, 34), "6222": (110, 200, 38), "6224": (120, 215, 40), "6226": (130, 230, 40),
+    "6228": (140, 250, 42), "6230": (150, 270, 45),
+}
+_SERIE_63 = {
+    "6300": (10, 35, 11), "6301": (12, 37, 12), "6302": (15, 42, 13), "6303": (17, 47, 14),
+    "6304": (20, 52, 15), "6305": (25, 62, 17), "6306": (30, 72, 19), "6307": (35, 80, 21),
+    "6308": (40, 90, 23), "6309": (45, 100, 25), "6310": (50, 110, 27), "6311": (55, 120, 29),
+    "6312": (60, 130, 31), "6313": (65, 140, 33), "6314": (70, 150, 35), "6315": (75, 160, 37),
+    "6316": (80, 170, 39), "6317": (85, 180, 41), "6318": (90, 190, 43), "6319": (95, 200, 45),
+    "6320": (100, 215, 47), "6322": (110, 240, 50), "6324": (120, 260, 55), "6326": (130, 280, 58),
+    "6328": (140, 300, 62), "6330": (150, 320, 65),
+}
+_SERIE_222 = {
+    "22205": (25, 52, 18), "22206": (30, 62, 20), "22207": (35, 72, 23), "22208": (40, 80, 23),
+    "22209": (45, 85, 23), "22210": (50, 90, 23), "22211": (55, 100, 25), "22212": (60, 110, 28),
+    "22213": (65, 120, 31), "22214": (70, 125, 31), "22215": (75, 130, 31), "22216": (80, 140, 33),
+    "22217": (85, 150, 36), "22218": (90, 160, 40), "22219": (95, 170, 43), "22220": (100, 180, 46),
+    "22222": (110, 200, 53), "22224": (120, 215, 58), "22226": (130, 230, 64), "22228": (140, 250, 68),
+    "22230": (150, 270, 73),
+}
+_SERIE_223 = {
+    "22308": (40, 90, 33), "22309": (45, 100, 36), "22310": (50, 110, 40), "22311": (55, 120, 43),
+    "22312": (60, 130, 46), "22313": (65, 140, 48), "22314": (70, 150, 51), "22315": (75, 160, 55),
+    "22316": (80, 170, 58), "22317": (85, 180, 60), "22318": (90, 190, 64), "22319": (95, 200, 67),
+    "22320": (100, 215, 73), "22322": (110, 240, 80), "22324": (120, 260, 86),
+}
+
+CATALOGO = {**_SERIE_60, **_SERIE_62, **_SERIE_63, **_SERIE_222, **_SERIE_223}
+
+# Gp = 0,005 · D · B: relubricación por el costado (mínimo 5 g)
+GRASA_CATALOGO = {codigo: max(5, round(0.005 * D * B, 1)) for codigo, (_, D, B) in CATALOGO.items()}
+
+# Rodillos cilíndricos (NU, NJ, NUP, N) de las series 2, 3 y 10 y de contacto
+# angular (72xx/73xx) comparten medidas con los rígidos de bolas 62xx/63xx/60xx
+# del mismo tamaño; las series anchas (NU22xx, NU23xx) no tienen equivalente
+_PREFIJOS_EQUIVALENTES = ("NUP", "NU", "NJ", "N")
+_EQUIVALENCIAS_ANGULARES = {"72": "62", "73": "63"}
+
+# Sufijos de rodamientos sellados/blindados de los dos lados: no se relubrican.
+# Con un solo sello o blindaje (RS, Z) queda un lado abierto, que sí se engrasa
+SUFIJOS_SELLADOS = ("2RS", "2RZ", "2Z", "ZZ", "LLU", "LLB", "DDU", "VV")
+
+_PATRON = re.compile(r"^([A-Z]*)(\d{3,5})(.*)$")
+
+
+def _sin_separadores(designacion):
+    return re.sub(r"[\s\-/.]", "", str(designacion).upper())
+
+
+def _codigo_base(prefijo, digitos):
+    """Código del catálogo para el prefijo y los dígitos de una designación."""
+    if prefijo in _PREFIJOS_EQUIVALENTES:
+        if len(digitos) == 3 and digitos[0] in "23":
+            return "6" + digitos
+        if len(digitos) == 4 and digitos[:2] == "10":
+            return "60" + digitos[2:]
+        return prefijo + digitos
+    if not prefijo and digitos[:2] in _EQUIVALENCIAS_ANGULARES:
+        return _EQUIVALENCIAS_ANGULARES[digitos[:2]] + digitos[2:4]
+    return digitos
+
+
+def identificar(designacion):
+    """Normaliza una designación (6315, 6205-2RS, NU215 ECP...).
+
+    Devuelve (codigo_base, sellado, medidas); medidas es None si el código no
+    está en el catálogo.
+    """
+    texto = _sin_separadores(designacion)
+    m = _PATRON.match(texto)
+    if not m:
+        return None, False, None
+    prefijo, digitos, sufijo = m.groups()
+    # Tres dígitos solo con prefijo (NU215); sin prefijo no es una designación
+    if len(digitos) == 3 and prefijo not in _PREFIJOS_EQUIVALENTES:
+        return None, False, None
+
+    # "62052RS": los 5 dígitos no existen, pero "6205" + "2RS" sí
+    if len(digitos) == 5 and _codigo_base(prefijo, digitos) not in CATALOGO \
+            and _codigo_base(prefijo, digitos[:4]) in CATALOGO:
+        digitos, sufijo = digitos[:4], digitos[4:] + sufijo
+
+    codigo = _codigo_base(prefijo, digitos)
+    sellado = any(s in sufijo for s in SUFIJOS_SELLADOS)
+    return codigo, sellado, CATALOGO.get(codigo)
+
+
+def es_sellado(designacion):
+    return identificar(designacion)[1]
+
+
+def factor_rodamiento(designacion):
+    """Factor K del intervalo de relubricación según el tipo de rodamiento.
+
+    10 para rígidos de bolas y contacto angular, 5 para rodillos cilíndricos
+    (NU, NJ, NUP, N) y 1 para rodillos a rótula (222xx, 223xx...).
+    """
+    texto = _sin_separadores(designacion)
+    m = _PATRON.match(texto)
+    if not m:
+        return 10
+    prefijo, digitos, _ = m.groups()
+    if prefijo in _PREFIJOS_EQUIVALENTES:
+        return 5
+    if len(digitos) == 5 and digitos[:2] in ("21", "22", "23", "24"):
+        return 1
+    return 10
+
+
+def _grasa_heuristica(codigo):
+    """Estimación original de MARPI a partir del código (ej: 6315 -> serie 3, tamaño 15)."""
+    try:
+        serie = int(codigo[-3])
+        tamanio = int(codigo[-2:])
+    except (ValueError, IndexError):
+        return 0
+    if serie == 3:
+        gramos = (tamanio * 2.8) - 2
+    elif serie == 2:
+        gramos = tamanio * 1.5
+    else:
+        gramos = tamanio * 1.2
+    return max(5, round(gramos, 1))
+
+
+def calcular_grasa_marpi(rodamiento):
+    """Calcula gramos de grasa según el modelo del rodamiento.
+
+    Con el rodamiento en catálogo se usa GRASA_CATALOGO; sellados: 0 g. Si no
+    está en catálogo, estimación por serie.
+    """
+    if not rodamiento or str(rodamiento).lower() in ["-", "s/d", "nan", "none"]:
+        return 0
+
+    codigo, sellado, medidas = identificar(rodamiento)
+    if codigo is None or sellado:
+        return 0
+    if medidas is None:
+        return _grasa_heuristica(codigo)
+    return GRASA_CATALOGO[codigo]
+
+
+def calcular_grasa_lote(rodamientos):
+    """Gramos de grasa para una columna entera de designaciones.
+
+    En una flota hay pocos modelos distintos: se resuelve cada valor distinto
+    una vez y el resultado se reparte con un solo map sobre la columna, con el
+    mismo índice de entrada.
+    """
+    rodamientos = pd.Series(rodamientos)
+    texto = rodamientos.astype(str).where(rodamientos.notna(), "")
+    por_valor = {valor: calcular_grasa_marpi(valor) for valor in texto.unique()}
+    return texto.map(por_valor).astype(float)
+
+
+# Plan de relubricación -----------------------------------------------------
+
+# Servicio continuo: el intervalo en horas de marcha se pasa a días de calendario
+HORAS_POR_DIA = 24
+INTERVALO_MAX_DIAS = 365
+RPM_POR_DEFECTO = 1500
+DIAS_AVISO = 30
+
+
+def _parametros_intervalo(designacion):
+    """(d, K) para el intervalo; d sale del catálogo o del código (tamaño x 5)."""
+    codigo, sellado, medidas = identificar(designacion)
+    if codigo is None or sellado:
+        return None
+    if medidas is not None:
+        diam_int = medidas[0]
+    else:
+        try:
+            diam_int = int(codigo[-2:]) * 5
+        except ValueError:
+            return None
+    if diam_int <= 0:
+        return None
+    return diam_int, factor_rodamiento(designacion)
+
+
+def intervalo_relubricacion_dias(rpm, diam_int, factor):
+    """Intervalo de relubricación en días (vectorizado sobre arrays o Series).
+
+    tf = K · (14·10⁶ / (n · √d) − 4 · d) horas, con piso de 7 días y tope
+    de INTERVALO_MAX_DIAS.
+    """
+    rpm = pd.Series(rpm, dtype="float64")
+    diam_int = pd.Series(diam_int, dtype="float64", index=rpm.index)
+    factor = pd.Series(factor, dtype="float64", index=rpm.index)
+    horas = factor * (14e6 / (rpm * diam_int ** 0.5) - 4 * diam_int)
+    return (horas / HORAS_POR_DIA).clip(lower=7, upper=INTERVALO_MAX_DIAS).round()
+
+
+def plan_relubricacion(df, hoy=None):
+    """Próxima relubricación de cada motor y lado (LA/LOA) de toda la flota.
+
+    La última relubricación de cada lado sale de las filas con Tipo_Tarea de
+    relubricación o con Gramos_LA/Gramos_LOA cargados; rodamiento y RPM son los
+    últimos informados para el Tag en cualquier intervención. Los rodamientos
+    sellados no figuran. El resultado queda ordenado por días restantes (los
+    vencidos primero, los que nunca se lubricaron al final).
+    """
+    columnas = ["Tag", "N_Serie", "Lado", "Rodamiento", "RPM", "Gramos", "Ultima",
+                "Intervalo_dias", "Proxima", "Dias_restantes", "Estado"]
+    if df.empty or "Tag" not in df.columns or "Fecha_DT" not in df.columns:
+        return pd.DataFrame(columns=columnas)
+    hoy = pd.Timestamp.now().normalize() if hoy is None else pd.Timestamp(hoy)
+
+    datos = df[df["Tag"].notna()].sort_values("Fecha_DT", kind="stable")
+    por_tag = datos.groupby("Tag", sort=False)
+
+    # Último dato informado por motor (last() saltea los nulos)
+    presentes = [c for c in ["N_Serie", "RPM", "Rodamiento_LA", "Rodamiento_LOA"] if c in datos.columns]
+    motores = por_tag[presentes].last().reindex(columns=["N_Serie", "RPM", "Rodamiento_LA", "Rodamiento_LOA"])
+
+    es_relub = datos["Tipo_Tarea"].astype(str).str.contains("lubricaci", case=False, na=False) \
+        if "Tipo_Tarea" in datos.columns else pd.Series(False, index=datos.index)
+
+    lados = []
+    for lado in ["LA", "LOA"]:
+        gramos = pd.to_numeric(datos[f"Gramos_{lado}"], errors="coerce") \
+            if f"Gramos_{lado}" in datos.columns else pd.Series(float("nan"), index=datos.index)
+        # Una relubricación sin gramos cargados cuenta para los dos lados
+        hecho = (gramos > 0) | (es_relub & gramos.isna())
+        ultima = datos.loc[hecho].groupby("Tag")["Fecha_DT"].max()
+        lados.append(pd.DataFrame({
+            "Tag": motores.index,
+            "N_Serie": motores["N_Serie"].to_numpy(),
+            "Lado": lado,
+            "Rodamiento": motores[f"Rodamiento_{lado}"].to_numpy(),
+            "RPM": motores["RPM"].to_numpy(),
+            "Ultima": ultima.reindex(motores.index).to_numpy(),
+        }))
+    plan = pd.concat(lados, ignore_index=True)
+    plan = plan[plan["Rodamiento"].notna()]
+
+    # Cada modelo distinto se resuelve una sola vez
+    rodamientos = plan["Rodamiento"].astype(str)
+    parametros = {r: _parametros_intervalo(r) for r in rodamientos.unique()}
+    diam_int = rodamientos.map(lambda r: parametros[r][0] if parametros[r] else None)
+    plan = plan[diam_int.notna()]
+    if plan.empty:
+        return pd.DataFrame(columns=columnas)
+    rodamientos = rodamientos[plan.index]
+    diam_int = diam_int[plan.index]
+    factor = rodamientos.map(lambda r: parametros[r][1])
+
+    rpm = pd.to_numeric(plan["RPM"].astype(str).str.extract(r"(\d+(?:[.,]\d+)?)")[0].str.replace(",", "."),
+                        errors="coerce")
+    rpm = rpm.where(rpm > 0, RPM_POR_DEFECTO).fillna(RPM_POR_DEFECTO)
+
+    plan = plan.assign(
+        Gramos=calcular_grasa_lote(rodamientos).to_numpy(),
+        Intervalo_dias=intervalo_relubricacion_dias(rpm, diam_int, factor).to_numpy(),
+    )
+    plan["Proxima"] = plan["Ultima"] + pd.to_timedelta(plan["Intervalo_dias"], unit="D")
+    plan["Dias_restantes"] = (plan["Proxima"] - hoy).dt.days.astype("Int64")
+    plan["Estado"] = pd.Series("Al día", index=plan.index) \
+        .mask(plan["Dias_restantes"] <= DIAS_AVISO, "Próximo") \
+        .mask(plan["Dias_restantes"] < 0, "Vencido") \
+        .mask(plan["Ultima"].isna(), "Sin registro")
+
+    return plan.sort_values(["Dias_restantes", "Tag", "Lado"], na_position="last", kind="stable") \
+        .reset_index(drop=True)[columnas]
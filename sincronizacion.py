@@ -0,0 +1,167 @@
+"""Copias en memoria de las hojas, al día con pocas lecturas al almacén.
+
+Cada copia recuerda la marca del almacén con que se leyó: mientras no cambie no
+se lee nada más. Si cambió, la copia baja desde la última fila con datos que
+conoce hacia abajo y agrega lo nuevo; la hoja entera se vuelve a leer si esa
+fila ya no está igual en su lugar (se borró o se corrió algo arriba), si
+aparecieron columnas o cada `recarga_completa` segundos. Una edición en una
+fila anterior a la última no mueve nada de eso: se ve recién con la próxima
+recarga completa.
+
+Las filas se cuentan como en la planilla y no con len(df): leer() no trae las
+filas en blanco, pero su índice es la posición de cada fila en la hoja. Las
+filas en blanco que quedan en el medio (una fila vaciada a mano) se borran en
+la recarga completa, como hacía la reescritura completa de la hoja: con un
+hueco, Sheets agrega las filas nuevas en el hueco y no al final.
+"""
+import logging
+import threading
+import time
+
+import pandas as pd
+
+import almacenamiento
+from hojas import COLUMNAS_DERIVADAS, filas_a_dataframe, normalizar_datos
+
+log = logging.getLogger("marpi")
+
+RECARGA_COMPLETA = 600  # segundos entre recargas completas de respaldo
+
+
+def _huella(df):
+    """Cambia si cambian los datos o la posición de alguna fila."""
+    return int(pd.util.hash_pandas_object(df).sum()) if not df.empty else 0
+
+
+def _tiene_datos(fila):
+    return any(v not in ("", None) for v in fila)
+
+
+class CopiaHoja:
+    """Copia de `hoja` compartida por todas las sesiones del proceso.
+
+    `df.attrs["version"]` cambia cuando cambia la copia; una recarga completa
+    que trae lo mismo que la anterior no la cambia, así que las cachés armadas
+    sobre la copia la sobreviven. `al_recargar(df)` y `al_agregar(nuevas)`
+    avisan de cada cambio (p. ej. para el espejo local). Con
+    `incremental=False` cada cambio de marca relee la hoja entera: para hojas
+    chicas o que se editan en el medio.
+    """
+
+    def __init__(self, hoja, incremental=True, recarga_completa=RECARGA_COMPLETA, al_recargar=None,
+                 al_agregar=None, reloj=time.time):
+        self.hoja = hoja
+        self.incremental = incremental
+        self.recarga_completa = recarga_completa
+        self._al_recargar = al_recargar
+        self._al_agregar = al_agregar
+        self._reloj = reloj
+        self.lock = threading.Lock()
+        self.df = None
+        # Filas de la hoja hasta la última con datos, encabezado incluido
+        self.filas = 0
+        self.ultima_fila = None
+        self.marca = None
+        self.recarga = 0.0
+        self.version = 0
+        self._huella = None
+
+    def invalidar(self):
+        """La próxima sincronización relee la hoja entera (p. ej. tras borrar filas)."""
+        self.recarga = 0.0
+
+    def sincronizar(self, alm):
+        """Devuelve la copia al día con el almacén `alm`.
+
+        Sin conexión se sigue sirviendo la última copia; si todavía no hay
+        ninguna, el error se propaga.
+        """
+        with self.lock:
+            try:
+                try:
+                    marca = alm.marca(self.hoja)
+                except Exception:
+                    marca = None
+
+                vencida = self._reloj() - self.recarga > self.recarga_completa
+                if self.df is None or self.df.empty or vencida:
+                    marca = self._recargar(alm, marca)
+                elif marca is None or marca != self.marca:
+                    if not self.incremental or not self._agregar_nuevas(alm):
+                        marca = self._recargar(alm, marca)
+                self.marca = marca
+            except Exception:
+                if self.df is None:
+                    raise
+            return self.df
+
+    def _recargar(self, alm, marca):
+        """Lee la hoja entera y devuelve la marca con que queda la copia."""
+        df = normalizar_datos(alm.leer(self.hoja))
+        if self._hay_huecos(df) and self._borrar_huecos(alm, marca, df):
+            df = df.set_axis(range(len(df)))
+            # La marca cambió con el borrado: la próxima vez se mira desde la última fila
+            marca = None
+        filas = int(df.index[-1]) + 2 if len(df) else 1
+        self.ultima_fila = alm.fila(self.hoja, filas) if len(df) else None
+        self.filas = filas
+        self.recarga = self._reloj()
+
+        huella = _huella(df)
+        if self.df is None or huella != self._huella:
+            self.version += 1
+            df.attrs["version"] = self.version
+            self.df = df
+            self._huella = huella
+            if self._al_recargar is not None:
+                self._al_recargar(df)
+        return marca
+
+    @staticmethod
+    def _hay_huecos(df):
+        return len(df) > 0 and int(df.index[-1]) + 1 != len(df)
+
+    def _borrar_huecos(self, alm, marca, df):
+        """Borra las filas en blanco del medio de la hoja, si la hoja sigue como se leyó."""
+        huecos = sorted(set(range(int(df.index[-1]) + 1)) - set(df.index))
+
+        def armar(almacen):
+            actual = almacen.marca(self.hoja)
+            if marca is None or actual != marca:
+                raise almacenamiento.Conflicto(self.hoja, marca, actual)
+            # Índices de borrado: desde 0 con el encabezado
+            return {"encabezados": None, "borrar": [h + 1 for h in huecos], "agregar": []}
+
+        try:
+            almacenamiento.escribir(alm, self.hoja, armar, reintentos=1)
+            return True
+        except Exception as e:
+            log.warning("%s: no se borraron %d filas en blanco (%s)", self.hoja, len(huecos), e)
+            return False
+
+    def _agregar_nuevas(self, alm):
+        """Agrega a la copia las filas que aparecieron debajo de la última.
+
+        Devuelve False si la última fila conocida ya no está igual en su lugar
+        o si llegaron columnas nuevas: entonces hay que releer la hoja entera.
+        """
+        cola = alm.filas_desde(self.hoja, self.filas)
+        columnas = [c for c in self.df.columns if c not in COLUMNAS_DERIVADAS]
+        if not cola or cola[0] != self.ultima_fila or any(len(f) > len(columnas) for f in cola):
+            return False
+
+        # cola[i] es la fila self.filas + i de la hoja; las filas en blanco se saltean
+        con_datos = [i for i, f in enumerate(cola) if i > 0 and _tiene_datos(f)]
+        if not con_datos:
+            return True
+        nuevas = normalizar_datos(filas_a_dataframe([cola[i] for i in con_datos], self.df))
+        nuevas.index = [self.filas - 2 + i for i in con_datos]
+        if self._al_agregar is not None:
+            self._al_agregar(nuevas)
+        self.df = pd.concat([self.df, nuevas])
+        self.filas += con_datos[-1]
+        self.ultima_fila = cola[con_datos[-1]]
+        self.version += 1
+        self.df.attrs["version"] = self.version
+        self._huella = None
+        return True
@@ -1,140 +1,185 @@
 import streamlit as st
 import pandas as pd
-from streamlit_gsheets import GSheetsConnection
 from datetime import date
 import os
 import re
 import time
+import threading
+import logging
+import sqlite3
+import base64
 from io import BytesIO
-from fpdf import FPDF
-import qrcode
-from PIL import Image, ImageDraw, ImageFont
-import streamlit.components.v1 as components
-import requests
 import urllib.parse
+from functools import partial
+import etiquetas
+from rodamientos import calcular_grasa_marpi, es_sellado as rodamiento_sellado, plan_relubricacion
+import medicion
+import almacenamiento
+from cola import ColaEnvios
+from sincronizacion import RECARGA_COMPLETA, CopiaHoja
+from hojas import CLAVES_MOTOR, VALORES_NULOS, normalizar_clave, normalizar_datos
+
+log = logging.getLogger("marpi")
+
+# Panel de diagnóstico y perfil con cProfile: solo si hay clave de administrador
+CLAVE_ADMIN = os.environ.get("MARPI_CLAVE_ADMIN", "")
+
+
+def iniciar_medicion():
+    """Abre la medición de este rerun. Si el anterior se cortó con st.rerun(),
+    se cierra acá, marcado como interrumpido."""
+    previo = st.session_state.get("_medicion_en_curso")
+    if previo is not None and not previo.cerrado:
+        st.session_state["_medicion_ultima"] = previo.cerrar(interrumpido=True)
+    perfilar = bool(CLAVE_ADMIN) and st.session_state.get("admin", False) and st.query_params.get("perfil") == "1"
+    st.session_state["_medicion_en_curso"] = medicion.iniciar_rerun(
+        st.session_state.get("navegacion_actual", ""), perfilar=perfilar)
+    medicion.fase("inicio")
+
+
+def terminar_medicion():
+    registro = st.session_state.get("_medicion_en_curso")
+    if registro is not None:
+        st.session_state["_medicion_ultima"] = registro.cerrar()
+
+
+def panel_medicion():
+    """Tiempos del último rerun de la sesión, para el administrador."""
+    with st.expander("⏱️ Diagnóstico"):
+        if not st.session_state.get("admin"):
+            if st.text_input("Clave de administrador", type="password", key="clave_admin") == CLAVE_ADMIN:
+                st.session_state.admin = True
+                st.rerun()
+            return
+
+        registro = st.session_state.get("_medicion_ultima")
+        if registro is None:
+            st.caption("Todavía no terminó ningún rerun en esta sesión.")
+            return
+        conteos = registro.conteos
+        st.caption(f"Último rerun ({registro.etiqueta or 'inicio'}): {registro.total_ms:.0f} ms"
+                   + (" · cortado por st.rerun()" if registro.interrumpido else ""))
+        st.caption(f"Backend: {conteos['backend']} llamadas · Caché: {conteos['cache_hit']} aciertos, "
+                   f"{conteos['cache_miss']} fallos")
+        st.dataframe(pd.DataFrame(registro.resumen(), columns=["Tipo", "Nombre", "ms", "Veces"]),
+                     hide_index=True, use_container_width=True)
+        if registro.perfil:
+            st.code(registro.perfil)
+        else:
+            st.caption("Con ?perfil=1 en la URL el próximo rerun se perfila con cProfile.")
 
-def boton_descarga_pro(tag, fecha, tarea, resp, serie, pot, rpm, carcasa, detalles, extra, obs):
-    st_btn = 'width:100%;background:#007bff;color:white;padding:15px;border:none;border-radius:10px;font-weight:bold;cursor:pointer;font-family:sans-serif;'
-    
-    contenido = f"""
-    <div style='text-align:center;border-bottom:2px solid #444;margin-bottom:15px;'>
-        <h2 style='margin:0;color:#007bff;'>REPORTE TÉCNICO DE MOTOR</h2>
-    </div>
-    <p><b>🏷️ TAG:</b> {tag} | <b>📅 FECHA:</b> {fecha}</p>
-    <p><b>🛠️ TAREA:</b> {tarea} | <b>👤 RESP:</b> {resp}</p>
-    <hr>
-    <div style='background:#1a1c23;padding:10px;border-radius:5px;'>
-        <b>📋 DATOS DE PLACA:</b> Serie: {serie} | Pot: {pot} | RPM: {rpm} | <b>Carcasa: {carcasa}</b>
-    </div>
-    <div style='background:#1a1c23;padding:10px;border-radius:5px;margin:10px 0; font-size:13px;'>
-        {detalles}
-        <i style='color:#aaa;'>{extra}</i>
-    </div>
-    <p><b>📝 OBSERVACIONES:</b><br>{obs}</p>
-    """
-    
-    js_code = f"""
-    const el = document.createElement('div');
-    el.style = 'padding:30px;background:#0e1117;color:white;width:600px;font-family:sans-serif;line-height:1.4;';
-    el.innerHTML = `{contenido}`;
-    document.body.appendChild(el);
-    html2canvas(el,{{backgroundColor:'#0e1117',scale:2}}).then(canvas => {{
-        const link = document.createElement('a');
-        link.download = 'Reporte_{tag}_{fecha}.png';
-        link.href = canvas.toDataURL('image/png');
-        link.click();
-        document.body.removeChild(el);
-    }});
+
+iniciar_medicion()
+
+
+def _texto_pdf(valor):
+    """fpdf solo maneja latin-1: lo que no entra (emojis, Ω) se reemplaza."""
+    return str(valor).replace("Ω", "Ohm").encode("latin-1", "replace").decode("latin-1")
+
+
+@medicion.cache(st.cache_data(max_entries=200, show_spinner=False))
+def reporte_intervencion_pdf(tag, fecha, tarea, resp, serie, pot, rpm, carcasa, detalles, obs):
+    """Reporte técnico de una intervención, armado en el servidor como PDF.
+
+    `detalles` es una lista de líneas. Se cachea por el contenido de la
+    intervención, así cada reporte se genera una sola vez.
     """
-    return f'<script src="https://cdnjs.cloudflare.com/ajax/libs/html2canvas/1.4.1/html2canvas.min.js"></script><button onclick="{js_code}" style="{st_btn}">📥 GUARDAR REPORTE COMPLETO</button>'
-def generar_etiqueta_honeywell(tag, serie, potencia):
-    try:
-        from PIL import Image, ImageDraw, ImageFont
-        import qrcode
-        import io 
-        import os
+    from fpdf import FPDF
 
+    pdf = FPDF()
+    pdf.add_page()
+    if os.path.exists("logo.png"):
+        pdf.image("logo.png", x=160, y=8, w=40)
 
-        etiqueta = Image.new('RGB', (600, 300), (255, 255, 255))
-        draw = ImageDraw.Draw(etiqueta)
+    pdf.set_font("Arial", "B", 16)
+    pdf.set_text_color(0, 123, 255)
+    pdf.cell(0, 12, "REPORTE TECNICO DE MOTOR", ln=1)
+    pdf.set_draw_color(68, 68, 68)
+    pdf.line(10, pdf.get_y() + 2, 200, pdf.get_y() + 2)
+    pdf.ln(6)
 
+    pdf.set_text_color(0, 0, 0)
+    for titulo, valor in [("TAG", tag), ("FECHA", fecha), ("TAREA", tarea), ("RESPONSABLE", resp)]:
+        pdf.set_font("Arial", "B", 11)
+        pdf.cell(40, 7, f"{titulo}:")
+        pdf.set_font("Arial", "", 11)
+        pdf.cell(0, 7, _texto_pdf(valor), ln=1)
 
-        qr_url = f"https://marpi-motores-mciqbovz6wqnaj9mw7fytb.streamlit.app/?serie={serie}&exact=1"
-        qr = qrcode.make(qr_url)
-        img_qr = qr.convert('RGB').resize((250, 250))
-        etiqueta.paste(img_qr, (20, 25))
+    secciones = [
+        ("DATOS DE PLACA", [f"Serie: {serie} | Pot: {pot} | RPM: {rpm} | Carcasa: {carcasa}"]),
+        ("DETALLES", detalles),
+        ("OBSERVACIONES", [obs]),
+    ]
+    for titulo, lineas in secciones:
+        pdf.ln(4)
+        pdf.set_font("Arial", "B", 11)
+        pdf.cell(0, 7, titulo, ln=1)
+        pdf.set_font("Arial", "", 10)
+        for linea in lineas:
+            pdf.multi_cell(0, 6, _texto_pdf(linea))
 
-      
-        x_derecha = 300
-        texto_nro = str(serie).upper()
+    return pdf.output(dest="S").encode("latin-1")
 
-        nombre_fuente = "Arial-Bold.ttf" 
-        if os.path.exists(nombre_fuente):
-            fuente = ImageFont.truetype(nombre_fuente, 35) 
-        else:
-     
-            fuente = ImageFont.load_default()
-            st.warning("⚠️ Sube 'Arial-Bold.ttf' a GitHub para ver el número grande.")
 
-        draw.text((x_derecha + 10, 100), texto_nro, font=fuente, fill=(0,0,0))
+# Subir este número si cambia el diseño de la etiqueta, para no servir las viejas
+VERSION_ETIQUETA = 1
 
 
-        try:
-            logo = Image.open("logo.png").convert('RGBA')
-        
-            logo.thumbnail((250, 80), Image.Resampling.LANCZOS)
-            etiqueta.paste(logo, (x_derecha + 15, 20), logo)
-        except:
-            draw.text((x_derecha + 15, 20), "MARPI MOTORES", fill=(0,0,0))
+@medicion.cache(st.cache_data(max_entries=500, show_spinner=False))
+def _render_etiqueta(serie, potencia, version):
+    """Dibuja la etiqueta; se cachea por (serie, potencia, versión de diseño)."""
+    if not etiquetas.hay_fuente():
+        st.warning("⚠️ Sube 'Arial-Bold.ttf' a GitHub para ver el número grande.")
+    return etiquetas.etiqueta_png(serie)
 
 
-        etiqueta_final = etiqueta.convert('L').point(lambda x: 0 if x < 128 else 255, '1')
+@medicion.cache(st.cache_data(max_entries=20, show_spinner=False))
+def exportar_etiquetas_pdf(series, version=VERSION_ETIQUETA):
+    """PDF con una etiqueta por página para todos los motores de `series`."""
+    return etiquetas.exportar_pdf(list(series))
 
-        buf = io.BytesIO()
-        etiqueta_final.save(buf, format='PNG') 
-        return buf.getvalue()
 
+def generar_etiqueta_honeywell(tag, serie, potencia):
+    try:
+        return _render_etiqueta(str(serie), str(potencia), VERSION_ETIQUETA)
     except Exception as e:
         st.error(f"Error en etiqueta: {e}")
         return None
-        
-def calcular_grasa_marpi(rodamiento):
-    """Calcula gramos de grasa según el modelo del rodamiento."""
-    if not rodamiento or str(rodamiento).lower() in ["-", "s/d", "nan", "none"]:
-        return 0
 
-    import re
-    # Buscamos los 4 o 5 dígitos del rodamiento (ej: 6315 o 22220)
-    match = re.search(r'\d{4,5}', str(rodamiento))
-    if not match:
-        return 0
-    
-    codigo = match.group()
 
-    try:
-        # Ejemplo para un 6315:
-        # serie = 3 (el segundo dígito suele indicar el ancho/serie)
-        # tamanio = 15 (los últimos dos dígitos indican el diámetro interior)
-        
-        serie = int(codigo[-3]) # Tomamos el tercer dígito de atrás hacia adelante
-        tamanio = int(codigo[-2:]) # Los últimos dos siempre son el tamaño
-        
-        # Ajuste de fórmula según serie
-        if serie == 3:
-            # Serie pesada: requiere más volumen
-            gramos = (tamanio * 2.8) - 2 
-        elif serie == 2:
-            # Serie media
-            gramos = (tamanio * 1.5)
-        else:
-            # Series ligeras (0 o 1)
-            gramos = (tamanio * 1.2)
+@medicion.cache(st.cache_data(max_entries=500, show_spinner=False))
+def generar_qr_png(url, tamanio=200):
+    """QR de `url` como PNG chico, generado en el servidor y cacheado por URL."""
+    import qrcode
+    from PIL import Image
+
+    img = qrcode.make(url, border=2).convert('1').resize((tamanio, tamanio), Image.Resampling.NEAREST)
+    buf = BytesIO()
+    img.save(buf, format='PNG', optimize=True)
+    return buf.getvalue()
+
+
+def html_impresion_etiqueta(b64_img, pedido=0):
+    """Documento mínimo que imprime la etiqueta a tamaño Honeywell apenas carga.
+
+    `pedido` distingue cada clic: Streamlit no vuelve a montar un componente
+    con el mismo HTML, y la misma etiqueta pedida dos veces no se imprimiría.
+    """
+    return f"""
+    <html><head><!-- pedido {pedido} --><style>
+        @page {{ size: 60mm 30mm; margin: 0; }}
+        body {{ margin: 0; }}
+        img {{ width: 60mm; height: 30mm; }}
+    </style></head><body>
+    <img src="data:image/png;base64,{b64_img}" onload="setTimeout(() => window.print(), 300);">
+    </body></html>"""
+
+
+@medicion.cache(st.cache_data(max_entries=500, show_spinner=False))
+def etiqueta_base64(serie, potencia, version=VERSION_ETIQUETA):
+    """La etiqueta ya codificada en base64, para incrustarla en HTML."""
+    return base64.b64encode(_render_etiqueta(serie, potencia, version)).decode('utf-8')
 
-        # Límite inferior de 5g para que no quede seco, y redondeo
-        return max(5, round(gramos, 1))
-        
-    except Exception:
-        return 0
         
 if "archivo_nombre" not in st.session_state:
     st.session_state.archivo_nombre = "Reporte_Motor"        
@@ -142,50 +187,455 @@ if "archivo_nombre" not in st.session_state:
 if "tag_fijo" not in st.session_state: st.session_state.tag_fijo = ""
 if "modo_manual" not in st.session_state: st.session_state.modo_manual = False
 
-conn = st.connection("gsheets", type=GSheetsConnection)
+def conexion():
+    """Conexión a Google Sheets (st.connection la reutiliza entre reruns).
+
+    streamlit_gsheets arrastra gspread y google-auth: se importa recién cuando
+    un modo lee o escribe, no al abrir la app.
+    """
+    from streamlit_gsheets import GSheetsConnection
+    return st.connection("gsheets", type=GSheetsConnection)
+
+
+# Dónde se leen y escriben las hojas: "gsheets" (por defecto) o "archivos"
+# (una hoja por archivo en MARPI_ALMACEN_DIR, formato csv o parquet)
+ALMACEN = os.environ.get("MARPI_ALMACEN", "gsheets")
+ALMACEN_DIR = os.environ.get("MARPI_ALMACEN_DIR", "datos_locales")
+ALMACEN_FORMATO = os.environ.get("MARPI_ALMACEN_FORMATO", "csv")
+
+
+@st.cache_resource(show_spinner=False)
+def _crear_almacen(tipo, carpeta, formato):
+    if tipo == "archivos":
+        return almacenamiento.AlmacenArchivos(carpeta, formato)
+    if tipo == "gsheets":
+        return almacenamiento.AlmacenGSheets(conexion)
+    raise ValueError(f"MARPI_ALMACEN desconocido: {tipo!r} (gsheets o archivos)")
+
+
+def almacen():
+    """El almacén configurado, con cada operación medida como llamada al backend."""
+    return medicion.backend(_crear_almacen(ALMACEN, ALMACEN_DIR, ALMACEN_FORMATO), ALMACEN)
+
 
-@st.cache_data(ttl=10) 
+@medicion.cache(st.cache_data(ttl=10))
 def cargar_datos_google():
     try:
- 
-        return conn.read(ttl=0) 
+        # Cada 10 s solo se verifica si la hoja cambió; se bajan las filas nuevas
+        return copia_hoja_principal().sincronizar(almacen())
     except Exception as e:
+        respaldo = leer_espejo(HOJA_PRINCIPAL)
+        if not respaldo.empty:
+            st.warning(f"⚠️ Sin conexión a Google Sheets, mostrando la copia local: {e}")
+            return normalizar_datos(respaldo)
         st.error(f"⚠️ Error conectando a Google Sheets: {e}")
         return pd.DataFrame()
 
 
-df_completo = cargar_datos_google()
+HOJA_PRINCIPAL = "Sheet1"
+HOJA_PLAN = "Planificación"
 
-try:
-    df_plan = conn.read(worksheet="Planificación")
-except Exception as e:
-    st.error(f"No se pudo leer la hoja de Planificación: {e}")
-    df_plan = pd.DataFrame()
 
-if "motor_seleccionado" not in st.session_state:
-    st.session_state.motor_seleccionado = None
+@st.cache_resource
+def copia_plan():
+    """Copia en memoria de Planificación. Es una hoja chica que se edita en
+    cualquier fila (el Estado de las OT), así que cada cambio de marca la
+    relee entera; sin cambios no se baja nada."""
+    return CopiaHoja(HOJA_PLAN, incremental=False, al_recargar=partial(guardar_en_espejo, HOJA_PLAN))
 
 
-params = st.query_params
-qr_valor = params.get("serie") or params.get("tag") or params.get("Serie") or params.get("Tag")
+@medicion.cache(st.cache_data(ttl=10))
+def cargar_plan_google():
+    try:
+        return copia_plan().sincronizar(almacen())
+    except Exception as e:
+        respaldo = leer_espejo(HOJA_PLAN)
+        if not respaldo.empty:
+            return normalizar_datos(respaldo)
+        st.error(f"No se pudo leer la hoja de Planificación: {e}")
+        return pd.DataFrame()
 
 
-indice_inicio = 1 
+def _version_contenido(df):
+    """Huella del contenido: cambia solo si cambian los datos de la hoja."""
+    return int(pd.util.hash_pandas_object(df, index=False).sum()) if not df.empty else 0
 
 
-if qr_valor:
-    v_qr = str(qr_valor).strip().upper()
-    
-   
-    if not df_completo.empty:
-        filtro = df_completo[
-            (df_completo['N_Serie'].astype(str).str.upper() == v_qr) | 
-            (df_completo['Tag'].astype(str).str.upper() == v_qr)
-        ]
-        
-      
-        if not filtro.empty:
-            st.session_state.motor_seleccionado = filtro.iloc[-1]
+# Columnas que muestra cada lista del tablero
+COLUMNAS_TABLERO = {
+    "agenda": ["Motor", "OT"],
+    "procesos": ["Motor", "Encargado"],
+    "listos": ["Motor", "OT"],
+    "recientes": ["Motor", "Tarea", "Estado"],
+    "lubricaciones": ["Tag"],
+}
+ESTADOS_TABLERO = {"agenda": "Pendiente", "procesos": "En Proceso", "listos": "Finalizado"}
+
+
+def _tabla_tablero(df, clave):
+    return df.reindex(columns=COLUMNAS_TABLERO[clave]).reset_index(drop=True)
+
+
+@medicion.cache(st.cache_resource(max_entries=2, show_spinner=False))
+def _resumen_por_version(_df_p, version_plan, _df_s, version_datos, dia):
+    resumen = {clave: _tabla_tablero(pd.DataFrame(), clave) for clave in COLUMNAS_TABLERO}
+    resumen["total_lub"] = 0
+
+    if not _df_p.empty and "Estado" in _df_p.columns:
+        # Una sola pasada: cada estado sale de su grupo
+        grupos = _df_p.groupby("Estado", sort=False).indices
+        for clave, estado in ESTADOS_TABLERO.items():
+            if estado in grupos:
+                resumen[clave] = _tabla_tablero(_df_p.iloc[grupos[estado]], clave)
+
+    if not _df_p.empty and "Fecha_DT" in _df_p.columns:
+        hace_5_dias = pd.Timestamp(dia) - pd.Timedelta(days=5)
+        recientes = _df_p[_df_p["Fecha_DT"] >= hace_5_dias].sort_values(by="Fecha_DT", ascending=False)
+        resumen["recientes"] = _tabla_tablero(recientes, "recientes")
+
+    if not _df_s.empty and "Tipo_Tarea" in _df_s.columns:
+        df_solo_lub = _df_s[_df_s["Tipo_Tarea"].astype(str).str.contains("Relubricacion", case=False, na=False)]
+        resumen["total_lub"] = len(df_solo_lub)
+        resumen["lubricaciones"] = _tabla_tablero(df_solo_lub.tail(10), "lubricaciones")
+
+    return resumen
+
+
+def calcular_resumen_taller():
+    """Contadores y listas del tablero "Estado del Taller".
+
+    Se calculan sobre los datos ya cacheados de Planificación y Sheet1 una vez
+    por versión de cada hoja (y por día, por los movimientos recientes); cada
+    lista ya viene con las columnas que se muestran.
+    """
+    df_p = cargar_plan_google()
+    df_s = cargar_datos_google()
+    # La huella solo para la copia local, que no trae versión: get() con un
+    # valor por defecto la calcularía (recorriendo las dos hojas) en cada rerun
+    version_plan = df_p.attrs["version"] if "version" in df_p.attrs else _version_contenido(df_p)
+    version_datos = df_s.attrs["version"] if "version" in df_s.attrs else _version_contenido(df_s)
+    return _resumen_por_version(df_p, version_plan, df_s, version_datos, pd.Timestamp.now().normalize())
+
+
+# Cachés que dependen de cada hoja. Un guardado invalida solo las de la hoja
+# que tocó; lo que no depende de los datos (etiquetas, QR) no figura acá.
+CACHES_POR_HOJA = {
+    HOJA_PRINCIPAL: [cargar_datos_google],
+    HOJA_PLAN: [cargar_plan_google],
+}
+
+
+def refrescar_hoja(worksheet):
+    """Invalida solo las cachés que dependen de la hoja que se modificó."""
+    for funcion in CACHES_POR_HOJA.get(worksheet, []):
+        funcion.clear()
+
+
+def _valor_celda(valor):
+    """Convierte un valor de pandas/numpy a algo que la API de Sheets acepte."""
+    if valor is None:
+        return ""
+    try:
+        if pd.isna(valor):
+            return ""
+    except (TypeError, ValueError):
+        pass
+    if hasattr(valor, "item"):
+        return valor.item()
+    return valor
+
+
+def escribir_hoja(worksheet, armar):
+    """Escribe en la hoja con almacenamiento.escribir: versión base,
+    verificación antes de escribir y reintento sobre la versión nueva."""
+    cambios = almacenamiento.escribir(almacen(), worksheet, armar)
+    if cambios["borrar"] and worksheet == HOJA_PRINCIPAL:
+        # Las filas se corrieron: la próxima sincronización tiene que ser completa
+        copia_hoja_principal().invalidar()
+    return cambios
+
+
+def _indices_con_clave(alm, worksheet, encabezados, columna, valores):
+    """Filas (índice desde 0, encabezado incluido) cuya `columna` está en `valores`."""
+    objetivo = {str(v).strip().upper() for v in valores if str(v).strip()}
+    if not objetivo or columna not in encabezados:
+        return []
+    columna_valores = alm.columna(worksheet, encabezados.index(columna))
+    return [i for i, v in enumerate(columna_valores) if i > 0 and str(v).strip().upper() in objetivo]
+
+
+def agregar_filas(worksheet, filas, reemplazar=None):
+    """Agrega una fila (dict) o un lote de filas al final de la hoja.
+
+    Solo viaja lo nuevo: se lee la fila de encabezados, se agregan las columnas
+    que falten y se hace un append, sin reenviar el contenido existente.
+    `reemplazar` ({columna: valores}) borra en la misma escritura las filas que
+    tengan esas claves, leyendo solo esas columnas: así un motor que se vuelve a
+    registrar queda en una sola fila aunque otro lo haya cargado recién.
+    """
+    if isinstance(filas, dict):
+        filas = [filas]
+    if not filas:
+        return 0
+
+    def armar(alm):
+        encabezados = alm.encabezados(worksheet)
+        faltantes = []
+        for fila in filas:
+            for col in fila:
+                if col not in encabezados and col not in faltantes:
+                    faltantes.append(col)
+        borrar = set()
+        for columna, valores in (reemplazar or {}).items():
+            borrar.update(_indices_con_clave(alm, worksheet, encabezados, columna, valores))
+        encabezados = encabezados + faltantes
+        return {
+            "encabezados": encabezados if faltantes else None,
+            "borrar": sorted(borrar),
+            "agregar": [[_valor_celda(fila.get(col, "")) for col in encabezados] for fila in filas],
+        }
+
+    return len(escribir_hoja(worksheet, armar)["agregar"])
+
+
+@st.cache_resource
+def copia_hoja_principal():
+    """Copia en memoria de Sheet1, compartida por todas las sesiones del proceso.
+
+    Cada 10 s (la caché de cargar_datos_google) se mira la marca del almacén:
+    en Google Sheets, la fecha del archivo según la API de Drive, una llamada
+    que no cuenta en la cuota de lectura de Sheets. Si cambió se bajan solo
+    las filas nuevas; ver sincronizacion.
+    """
+    return CopiaHoja(HOJA_PRINCIPAL, al_recargar=partial(guardar_en_espejo, HOJA_PRINCIPAL),
+                     al_agregar=partial(guardar_en_espejo, HOJA_PRINCIPAL, agregar=True))
+
+
+# Espejo local en SQLite de Sheet1 y Planificación: la copia que se muestra
+# cuando el almacén no responde. Con conexión las búsquedas van por el índice
+# en memoria (indice_motores); sin conexión, filas_de_motor consulta el espejo
+# por Tag/N_Serie. Se puede desactivar con MARPI_ESPEJO_DB="".
+ESPEJO_DB = os.environ.get("MARPI_ESPEJO_DB", ".espejo_marpi.db")
+TABLAS_ESPEJO = {HOJA_PRINCIPAL: "sheet1", HOJA_PLAN: "planificacion"}
+# Columnas que se buscan en el espejo; se indexan normalizadas para que la
+# búsqueda no dependa de mayúsculas ni espacios
+INDICES_ESPEJO = {HOJA_PRINCIPAL: CLAVES_MOTOR, HOJA_PLAN: []}
+
+
+def guardar_en_espejo(worksheet, df, agregar=False):
+    """Copia `df` al espejo SQLite (reemplazando la tabla, o agregando filas)."""
+    if not ESPEJO_DB or df is None:
+        return
+    tabla = TABLAS_ESPEJO[worksheet]
+    try:
+        with sqlite3.connect(ESPEJO_DB) as db:
+            df.to_sql(tabla, db, if_exists="append" if agregar else "replace", index=True, index_label="_fila")
+            if not agregar:
+                for col in INDICES_ESPEJO[worksheet]:
+                    if col in df.columns:
+                        db.execute(f'CREATE INDEX IF NOT EXISTS "ix_{tabla}_{col}" ON "{tabla}" (UPPER(TRIM("{col}")))')
+    except Exception as e:
+        log.warning("Espejo SQLite: no se pudo actualizar %s (%s)", worksheet, e)
+
+
+def leer_espejo(worksheet, columna=None, valor=None):
+    """Lee del espejo SQLite la hoja entera o solo las filas con `columna` = `valor`."""
+    if not ESPEJO_DB or not os.path.exists(ESPEJO_DB):
+        return pd.DataFrame()
+    tabla = TABLAS_ESPEJO[worksheet]
+    sql = f'SELECT * FROM "{tabla}"'
+    params = ()
+    if columna:
+        sql += f' WHERE UPPER(TRIM("{columna}")) = ?'
+        params = (str(valor).strip().upper(),)
+    try:
+        with sqlite3.connect(ESPEJO_DB) as db:
+            return pd.read_sql_query(sql + " ORDER BY _fila", db, params=params, index_col="_fila")
+    except Exception:
+        return pd.DataFrame()
+
+
+def _por_version(df, cacheada, construir):
+    """`construir(df)` cacheado por versión de datos, si `df` es la hoja entera.
+
+    `cacheada(_df, version, filas)` devuelve (resultado, índice de filas del
+    DataFrame con que se armó). pandas copia los attrs en casi todas sus
+    operaciones, así que un recorte o una copia reordenada trae la misma
+    versión: si sus filas no son las de la caché se arma sin cachear.
+    """
+    version = df.attrs.get("version")
+    if version is None:
+        return construir(df)
+    resultado, filas = cacheada(df, version, len(df))
+    if not filas.equals(df.index):
+        return construir(df)
+    return resultado
+
+
+def _armar_indice_motores(df):
+    """Tag/N_Serie normalizado -> posiciones de sus filas (agrupando en pandas, sin recorrer filas)."""
+    posiciones = pd.Series(range(len(df)))
+    indice = {}
+    for col in CLAVES_MOTOR:
+        if col not in df.columns:
+            indice[col] = {}
+            continue
+        # Las claves ya vienen normalizadas desde normalizar_datos()
+        claves = df[col]
+        indice[col] = posiciones[claves.notna().values].groupby(claves.dropna().values, sort=False).agg(list).to_dict()
+    return indice
+
+
+@medicion.cache(st.cache_resource(max_entries=2))
+def _indice_por_version(_df, version, filas):
+    return _armar_indice_motores(_df), _df.index
+
+
+def indice_motores(df):
+    """Índice de motores de `df`, armado una sola vez por versión de datos y
+    compartido entre sesiones; buscar un motor pasa a ser un acceso a dict."""
+    return _por_version(df, _indice_por_version, _armar_indice_motores)
+
+
+def filas_de_motor(df, columna, valor):
+    """Filas de Sheet1 de un motor (por Tag o N_Serie), en el orden de la hoja.
+
+    Con datos de Google Sheets usa el índice en memoria de esa versión; con la
+    copia local (sin versión) consulta el índice del espejo SQLite.
+    """
+    if df.empty or columna not in df.columns or not str(valor).strip():
+        return df.iloc[0:0]
+    if df.attrs.get("version") is None:
+        return normalizar_datos(leer_espejo(HOJA_PRINCIPAL, columna, valor))
+    posiciones = indice_motores(df)[columna].get(normalizar_clave(valor), [])
+    return df.iloc[posiciones]
+
+
+def ultima_fila_motor(df, columna, valor):
+    """Último registro (el más abajo en la hoja) del motor, o None si no existe."""
+    filas = filas_de_motor(df, columna, valor)
+    return filas.iloc[-1] if not filas.empty else None
+
+
+def _posiciones_por_clave(opciones, claves_por_opcion):
+    """Clave (Tag o N_Serie) -> posición de la primera opción que la contiene."""
+    posiciones = {}
+    for i, claves in enumerate(claves_por_opcion, start=1):
+        for clave in claves:
+            if isinstance(clave, str):
+                posiciones.setdefault(clave, i)
+    return posiciones
+
+
+def _construir_opciones(df):
+    vacio = {"historial": [""], "pos_historial": {}, "relub": [""], "pos_relub": {}, "plan": ["Sin datos"]}
+    if df.empty or not set(CLAVES_MOTOR) <= set(df.columns):
+        return vacio
+
+    # Historial: un motor por N° de serie, con el Tag de su último registro
+    ultimos = df.dropna(subset=['N_Serie']).sort_values('Fecha_DT', ascending=False, kind='stable')
+    ultimos = ultimos.drop_duplicates(subset=['N_Serie'], keep='first')
+    ultimos = ultimos.assign(_op=ultimos['Tag'].fillna('S/T') + " | SN: " + ultimos['N_Serie']).sort_values('_op')
+    historial = [""] + ultimos['_op'].tolist()
+
+    # Relubricación: cada combinación Tag/serie que aparece en la hoja
+    combos = df.dropna(subset=['Tag'])[CLAVES_MOTOR].drop_duplicates()
+    combos = combos.assign(_op=combos['Tag'] + " | SN: " + combos['N_Serie'].fillna('S/S')).sort_values('_op')
+    relub = [""] + combos['_op'].tolist()
+
+    plan = (df['Tag'].fillna('S/T') + " | " + df['N_Serie'].fillna('S/S')).unique().tolist()
+
+    return {
+        "historial": historial,
+        "pos_historial": _posiciones_por_clave(historial, zip(ultimos['N_Serie'], ultimos['Tag'])),
+        "relub": relub,
+        "pos_relub": _posiciones_por_clave(relub, zip(combos['Tag'])),
+        "plan": plan,
+    }
+
+
+@medicion.cache(st.cache_resource(max_entries=2))
+def _opciones_por_version(_df, version, filas):
+    return _construir_opciones(_df), _df.index
+
+
+def opciones_motores(df):
+    """Listas de los selectores de motor y sus búsquedas por Tag/serie.
+
+    Se arman una vez por versión de datos con operaciones de pandas sobre
+    columnas; `pos_*` da la posición de la opción de un Tag o serie sin
+    recorrer la lista.
+    """
+    return _por_version(df, _opciones_por_version, _construir_opciones)
+
+
+@medicion.cache(st.cache_resource(max_entries=2, show_spinner=False))
+def _plan_relub_por_version(_df, version, filas, hoy):
+    return plan_relubricacion(_df, hoy), _df.index
+
+
+def plan_relubricacion_flota(df):
+    """Vencimientos de relubricación de toda la flota, calculados una vez por
+    versión de datos (y por día, porque los días restantes cambian con la fecha).
+    """
+    hoy = pd.Timestamp.now().normalize()
+    return _por_version(df, partial(_plan_relub_por_version, hoy=hoy), partial(plan_relubricacion, hoy=hoy))
+
+
+COLA_DIR = ".cola_envios"
+cola_envios = ColaEnvios(COLA_DIR, agregar_filas, al_enviar=refrescar_hoja)
+
+
+def encolar_fila(worksheet, fila):
+    """Guarda la fila en la cola local en disco y despierta al envío en segundo plano."""
+    nombre = cola_envios.encolar(worksheet, {k: _valor_celda(v) for k, v in fila.items()})
+    iniciar_envio_cola().set()
+    return nombre
+
+
+def _bucle_envio_cola(aviso, cola):
+    espera = 2
+    while True:
+        aviso.wait(timeout=espera if cola.pendientes() else 30)
+        aviso.clear()
+        try:
+            cola.vaciar()
+            espera = 2
+        except Exception as e:
+            # Reintento con espera creciente mientras Sheets no responda
+            espera = min(espera * 2, 300)
+            log.warning("Cola de envíos: reintento en %ss (%s)", espera, e)
+
+
+@st.cache_resource
+def iniciar_envio_cola():
+    """Arranca (una sola vez por proceso) el hilo que vacía la cola de envíos."""
+    aviso = threading.Event()
+    threading.Thread(target=_bucle_envio_cola, args=(aviso, cola_envios), daemon=True, name="cola_envios").start()
+    aviso.set()
+    return aviso
+
+
+iniciar_envio_cola()
+
+HISTORIAL_POR_PAGINA = 5
+
+# Hojas que necesita cada modo al entrar. Planificación se lee aparte donde
+# hace falta (tablero, etiquetas por planta).
+HOJAS_POR_MODO = {
+    "Nuevo Registro": [HOJA_PRINCIPAL],
+    "Historial y QR": [HOJA_PRINCIPAL],
+    "Gestión de Reparaciónes": [HOJA_PRINCIPAL],
+    "Relubricacion": [HOJA_PRINCIPAL],
+    "Mediciones de Campo": [HOJA_PRINCIPAL],
+}
+CARGA_POR_HOJA = {HOJA_PRINCIPAL: cargar_datos_google, HOJA_PLAN: cargar_plan_google}
+
+
+def cargar_datos_modo(modo):
+    """Lee (desde las cachés) las hojas declaradas para el modo."""
+    return {hoja: CARGA_POR_HOJA[hoja]() for hoja in HOJAS_POR_MODO.get(modo, [])}
+
 
 opciones_menu = ["Nuevo Registro", "Historial y QR", "Gestión de Reparaciónes", "Relubricacion", "Mediciones de Campo"]
 
@@ -193,9 +643,20 @@ opciones_menu = ["Nuevo Registro", "Historial y QR", "Gestión de Reparaciónes"
 if "navegacion_actual" not in st.session_state:
     st.session_state.navegacion_actual = "Historial y QR"
 
+
+@st.cache_resource(show_spinner=False)
+def logo_app():
+    """Bytes del logo, leídos del disco una sola vez por proceso."""
+    if not os.path.exists(etiquetas.RUTA_LOGO):
+        return None
+    with open(etiquetas.RUTA_LOGO, "rb") as f:
+        return f.read()
+
+medicion.fase("sidebar")
+
 with st.sidebar:
-    if os.path.exists("logo.png"): 
-        st.image("logo.png", width=150)
+    if logo_app() is not None:
+        st.image(logo_app(), width=150)
     st.title("⚡ MARPI MOTORES")
     
 
@@ -215,11 +676,34 @@ with st.sidebar:
         st.session_state.navegacion_actual = seleccion
         st.rerun()
 
-   
+    pendientes_envio = len(cola_envios.pendientes())
+    # Los rechazados muestran datos de los registros: solo para personal de MARPI
+    rechazados_envio = cola_envios.rechazados() if st.session_state.get("autorizado") else []
+    if pendientes_envio:
+        st.warning(f"📤 {pendientes_envio} registro(s) pendientes de enviar a Google Sheets")
+    elif not rechazados_envio:
+        st.caption("📤 Cola de envíos al día")
+    if rechazados_envio:
+        with st.expander(f"⛔ {len(rechazados_envio)} registro(s) rechazados por la hoja"):
+            for registro in rechazados_envio:
+                fila = registro["fila"]
+                st.caption(f"{fila.get('Fecha', '')} · {registro['worksheet']} · {fila.get('Tag', '')} · "
+                           f"{registro.get('error', '')}")
+            if st.button("🔁 Reintentar envío", key="reintentar_rechazados"):
+                cola_envios.reintentar_rechazados()
+                iniciar_envio_cola().set()
+                st.rerun()
+
+    st.caption(f"🔄 Registros nuevos: al instante. Correcciones en filas anteriores de la hoja: "
+               f"hasta {RECARGA_COMPLETA // 60} min.")
+
     if st.button("🧹 Inicio / Reset"):
         st.session_state.clear()
         st.rerun()
 
+    if CLAVE_ADMIN:
+        panel_medicion()
+
 
 modo = st.session_state.navegacion_actual
 
@@ -239,8 +723,15 @@ if modo in ["Nuevo Registro", "Gestión de Reparaciónes", "Relubricacion", "Med
                     st.rerun()
                 else:
                     st.error("⚠️ Clave incorrecta")
+        terminar_medicion()
         st.stop() 
-        
+
+# Cada modo lee solo las hojas que usa, y recién después del control de acceso
+medicion.fase("datos")
+datos_modo = cargar_datos_modo(modo)
+df_completo = datos_modo.get(HOJA_PRINCIPAL, pd.DataFrame())
+medicion.fase(f"modo: {modo}")
+
 if "form_key_plan" not in st.session_state:
     st.session_state.form_key_plan = 0
 
@@ -257,8 +748,7 @@ if modo == "Gestión de Reparaciónes":
             c1, c2 = st.columns(2)
             with c1:
                 f_ot = st.text_input("N° Orden de Trabajo (OT)").upper()
-                opciones_motores = df_completo['Tag'].astype(str) + " | " + df_completo['N_Serie'].astype(str) if not df_completo.empty else ["Sin datos"]
-                f_motor = st.selectbox("Seleccionar Motor", opciones_motores)
+                f_motor = st.selectbox("Seleccionar Motor", opciones_motores(df_completo)["plan"])
                 f_planta = st.text_input("Planta").upper()
                 f_inspector = st.selectbox("Inspector", ["-", "CONNAN ENZO", "VILLARTA EDGARDO", "CORREA MARCELO", "SALCEDO GASTON", "CORVALAN DARIO"])
     
@@ -273,7 +763,7 @@ if modo == "Gestión de Reparaciónes":
         if btn_plan:
             if f_ot and f_motor:
        
-                nueva_fila_plan = pd.DataFrame([{
+                nueva_fila_plan = {
                     "Fecha": f_fecha.strftime("%d/%m/%Y"),
                     "OT": f_ot,
                     "Motor": f_motor,
@@ -283,18 +773,12 @@ if modo == "Gestión de Reparaciónes":
                     "Tarea": f_tarea,
                     "Prioridad": f_prioridad,
                     "Estado": "Pendiente",
-                }])
-                
+                }
+
                 try:
-              
-                    df_plan_existente = conn.read(worksheet="Planificación", ttl=0)
-                    
-     
-                    df_actualizado = pd.concat([df_plan_existente, nueva_fila_plan], ignore_index=True)
-                    
-                   
-                    conn.update(worksheet="Planificación", data=df_actualizado)
-                    
+                    agregar_filas(HOJA_PLAN, nueva_fila_plan)
+                    refrescar_hoja(HOJA_PLAN)
+
                     st.success(f"✅ OT {f_ot} guardada en Agenda")
                     
                 
@@ -352,8 +836,7 @@ if modo == "Nuevo Registro":
 
         if not df_completo.empty and 'RPM' in df_completo.columns:
            
-            rpms_db = df_completo['RPM'].astype(str).unique().tolist()
-            rpms_db = [val for val in rpms_db if val not in ['nan', '-', 'None', '']]
+            rpms_db = df_completo['RPM'].dropna().astype(str).unique().tolist()
         else:
             rpms_db = []
 
@@ -422,47 +905,35 @@ if modo == "Nuevo Registro":
                     "Tipo_Tarea": "Nuevo Registro"
                 }
 
-             
-                df_nueva = pd.DataFrame([nueva_fila])
 
+                motor_ya_existe = False
+                tag_ya_existe = False
                 if not df_completo.empty:
-                    # Definimos la variable que te estaba faltando directamente aquí
                     # Esto busca si el número de serie (sn) ya está en el Excel
-                    motor_ya_existe = str(sn) in df_completo['N_Serie'].astype(str).values
-                    
+                    motor_ya_existe = bool(sn) and ultima_fila_motor(df_completo, 'N_Serie', sn) is not None
                     if motor_ya_existe:
                         st.info(f"🔄 Motor reconocido (SN: {sn}). Actualizando datos técnicos...")
-                        # Borramos la fila vieja del motor para que la nueva ocupe su lugar
-                        df_completo = df_completo[df_completo['N_Serie'].astype(str) != str(sn)]
-                
-                # Ahora unimos la base limpia con la fila nueva
-                df_nueva = pd.DataFrame([nueva_fila])
 
-                if not df_completo.empty:
-                    # --- CAMBIO CLAVE: BUSCAMOS POR TAG ---
-                    # t es la variable que usas para el Tag. 
-                    # Buscamos si ese Tag ya existe en la columna 'Tag' (o 'Motor') de tu Excel
-                    tag_ya_existe = str(t) in df_completo['Tag'].astype(str).values
-                    
+                    # Buscamos si ese Tag ya existe en la columna 'Tag' de tu Excel
+                    tag_ya_existe = ultima_fila_motor(df_completo, 'Tag', t) is not None
                     if tag_ya_existe:
                         st.info(f"🔄 Tag {t} detectado. Actualizando con el nuevo número de motor y manteniendo un solo registro.")
-                        # Borramos el registro viejo que tenga ese mismo TAG
-                        # Así, aunque el N° de Serie sea distinto, el Tag viejo se borra
-                        df_completo = df_completo[df_completo['Tag'].astype(str) != str(t)]
-                
-                # 2. Unimos la base limpia (sin el tag repetido) con la nueva info
-                df_actualizado = pd.concat([df_completo, df_nueva], ignore_index=True)
-                
+
                 try:
-                    # 3. Guardamos en el Excel
-                    conn.update(data=df_actualizado)
-                    st.cache_data.clear() 
+                    # Borramos en la hoja solo las filas viejas de ese motor/Tag
+                    # y agregamos la nueva al final, en una sola escritura y sin
+                    # reescribir toda la base. Las claves se buscan en la hoja
+                    # misma, no en df_completo, que puede tener hasta 10 s.
+                    agregar_filas(HOJA_PRINCIPAL, nueva_fila, reemplazar={"N_Serie": [sn], "Tag": [t]})
+                    refrescar_hoja(HOJA_PRINCIPAL)
                     st.success(f"✅ Registro de {t} actualizado. Ahora solo hay un motor con ese Tag.")
                     st.balloons()
                     
                     st.session_state.etiqueta_lista = generar_etiqueta_honeywell(t, sn, p)
                     st.session_state.motor_registrado = t
                     
+                except almacenamiento.Conflicto:
+                    st.error("⚠️ La hoja cambió varias veces mientras se guardaba. Volvé a intentar.")
                 except Exception as e:
                     st.error(f"❌ Error al conectar con Google Sheets: {e}")
             else:
@@ -479,105 +950,125 @@ if modo == "Nuevo Registro":
             file_name=f"Etiqueta_{st.session_state.motor_registrado}.png",
             mime="image/png"
         )
-  
+
+    st.divider()
+    with st.expander("🏷️ Etiquetas en lote (PDF)"):
+        criterio = st.radio("Motores a etiquetar", ["Todos", "Por planta", "Por lista de Tags"], horizontal=True)
+
+        series_lote = []
+        if not df_completo.empty:
+            if criterio == "Todos":
+                series_lote = df_completo['N_Serie'].dropna().unique().tolist()
+            elif criterio == "Por planta":
+                df_plan_lote = cargar_plan_google()
+                plantas = sorted(df_plan_lote['Planta'].dropna().unique().tolist()) if 'Planta' in df_plan_lote.columns else []
+                planta = st.selectbox("Planta", plantas)
+                if planta:
+                    # En Planificación el motor se guarda como "TAG | SERIE"
+                    motores = df_plan_lote.loc[df_plan_lote['Planta'] == planta, 'Motor'].dropna().astype(str)
+                    series_lote = [normalizar_clave(m.split(" | ")[-1]) for m in motores.unique()]
+                    # Los motores sin serie figuran como "S/S": no llevan etiqueta
+                    series_lote = [s for s in series_lote if s not in VALORES_NULOS and s != "S/S"]
+            else:
+                texto_tags = st.text_area("Tags (separados por coma o uno por línea)")
+                for tag_lote in re.split(r"[,\n;]+", texto_tags):
+                    fila_lote = ultima_fila_motor(df_completo, 'Tag', tag_lote) if tag_lote.strip() else None
+                    if fila_lote is not None and pd.notna(fila_lote['N_Serie']):
+                        series_lote.append(fila_lote['N_Serie'])
+
+        st.caption(f"{len(series_lote)} etiqueta(s) seleccionadas")
+        if st.button("🖨️ Generar PDF de etiquetas", disabled=not series_lote):
+            with st.spinner("Generando etiquetas..."):
+                st.session_state.pdf_etiquetas = exportar_etiquetas_pdf(tuple(sorted(set(series_lote))))
+
+        if st.session_state.get("pdf_etiquetas"):
+            st.download_button(
+                label="💾 Descargar etiquetas (PDF)",
+                data=st.session_state.pdf_etiquetas,
+                file_name="Etiquetas_MARPI.pdf",
+                mime="application/pdf"
+            )
+
 elif modo == "Historial y QR":
     st.title("🔍 Consulta y Gestión de Motores")
    
+    medicion.fase("tablero")
     st.markdown("### 📊 Estado del Taller")
     
     try:
-        df_res_plan = conn.read(worksheet="Planificación", ttl=0)
-        
-        df_res_plan['Fecha'] = pd.to_datetime(df_res_plan['Fecha'], dayfirst=True, errors='coerce')
-        hace_5_dias = pd.Timestamp.now() - pd.Timedelta(days=5)
-        
-        lista_agenda = df_res_plan[df_res_plan["Estado"] == "Pendiente"]
-        lista_intervenidos = df_res_plan[df_res_plan["Estado"] == "En Proceso"]
-        lista_reparados = df_res_plan[df_res_plan["Estado"] == "Finalizado"]
-        movimientos_recientes = df_res_plan[df_res_plan['Fecha'] >= hace_5_dias].sort_values(by='Fecha', ascending=False)
+        resumen = calcular_resumen_taller()
+        lista_agenda = resumen["agenda"]
+        lista_intervenidos = resumen["procesos"]
+        lista_reparados = resumen["listos"]
+        movimientos_recientes = resumen["recientes"]
         
         c1, c2 = st.columns(2)
 
+        def lista_tablero(tabla, vacio):
+            if tabla.empty:
+                st.write(vacio)
+            else:
+                st.dataframe(tabla, hide_index=True, use_container_width=True)
+
         with c1:
             with st.popover(f"📦 Agenda: {len(lista_agenda)}", use_container_width=True):
-                if not lista_agenda.empty:
-                    for _, r in lista_agenda.iterrows():
-                        st.write(f"🔹 **{r['Motor']}** (OT: {r['OT']})")
-                else: st.write("No hay pendientes.")
+                lista_tablero(lista_agenda, "No hay pendientes.")
 
             with st.popover(f"⚙️ Procesos: {len(lista_intervenidos)}", use_container_width=True):
-                if not lista_intervenidos.empty:
-                    for _, r in lista_intervenidos.iterrows():
-                        st.write(f"🛠️ **{r['Motor']}** - {r['Encargado']}")
-                else: st.write("Sin trabajos activos.")
-
-            with c2:
-                 try:
-                     df_principal = conn.read(worksheet="Sheet1", ttl=0)
-
-                     df_principal.columns = df_principal.columns.str.strip()
+                lista_tablero(lista_intervenidos, "Sin trabajos activos.")
 
-                     df_solo_lub = df_principal[df_principal['Tipo_Tarea'].str.contains('Relubricacion', case=False, na=False)]
-                     total_lub = len(df_solo_lub)
-                    
-                 except Exception as e:
-                     total_lub = 0
-
-                 with st.popover(f"💧 Relubricacion: {total_lub}", use_container_width=True):
-                     if total_lub > 0:
-                         st.write(f"Se encontraron {total_lub} equipos con tarea de Relubricacion:")
-                         for _, fila in df_solo_lub.tail(10).iterrows():
-                             st.write(f"🔹 {fila['Tag']}")
-                     else:
-                         st.write("No se encontraron registros de 'Relubricacion' en la columna Tipo_Tarea.")
             with st.popover(f"✅ Listos: {len(lista_reparados)}", use_container_width=True):
-                if not lista_reparados.empty:
-                    for _, r in lista_reparados.iterrows():
-                        st.write(f"🏁 **{r['Motor']}** - OT: {r['OT']}")
-                else: st.write("Nada para retirar.")
+                lista_tablero(lista_reparados, "Nada para retirar.")
+
+        with c2:
+            total_lub = resumen["total_lub"]
+            with st.popover(f"💧 Relubricacion: {total_lub}", use_container_width=True):
+                if total_lub > 0:
+                    st.write(f"Se encontraron {total_lub} equipos con tarea de Relubricacion (últimos 10):")
+                lista_tablero(resumen["lubricaciones"], "No se encontraron registros de 'Relubricacion' en la columna Tipo_Tarea.")
 
         if not movimientos_recientes.empty:
             with st.expander("🗓️ Movimientos última semana", expanded=False):
-                for _, f in movimientos_recientes.iterrows():
-                    st.markdown(f"**{f['Motor']}** - {f['Tarea']} (`{f['Estado']}`)")
+                st.dataframe(movimientos_recientes, hide_index=True, use_container_width=True)
+
+        plan_grasa = plan_relubricacion_flota(df_completo)
+        a_atender = plan_grasa[plan_grasa["Estado"].isin(["Vencido", "Próximo"])]
+        if not a_atender.empty:
+            n_vencidos = int((a_atender["Estado"] == "Vencido").sum())
+            with st.expander(f"🛢️ Plan de relubricación: {n_vencidos} vencidos, {len(a_atender) - n_vencidos} próximos", expanded=False):
+                st.dataframe(
+                    a_atender[["Estado", "Tag", "Lado", "Rodamiento", "Gramos", "Ultima", "Proxima", "Dias_restantes"]],
+                    hide_index=True, use_container_width=True,
+                    column_config={
+                        "Ultima": st.column_config.DateColumn("Última", format="DD/MM/YYYY"),
+                        "Proxima": st.column_config.DateColumn("Próxima", format="DD/MM/YYYY"),
+                        "Dias_restantes": st.column_config.NumberColumn("Días"),
+                        "Gramos": st.column_config.NumberColumn("Gramos", format="%.1f g"),
+                    },
+                )
+                sin_registro = int((plan_grasa["Estado"] == "Sin registro").sum())
+                if sin_registro:
+                    st.caption(f"{sin_registro} rodamientos sin relubricaciones registradas.")
     
     except Exception:
         st.caption("⚠️ Tablero temporalmente no disponible")
 
     st.divider()
+    medicion.fase("historial")
     if not df_completo.empty:
-        df_completo['N_Serie'] = df_completo['N_Serie'].fillna('S/S').astype(str).str.strip()
-        df_completo['Tag'] = df_completo['Tag'].fillna('S/T').astype(str).str.strip()
-
-        df_temp = df_completo.copy()
-        df_temp['Fecha_DT'] = pd.to_datetime(df_temp['Fecha'], dayfirst=True, errors='coerce')
-        
-        df_temp = df_temp.sort_values('Fecha_DT', ascending=False)
-
-        df_ultimos = df_temp.drop_duplicates(subset=['N_Serie'], keep='first')
-
-        opciones_base = [
-            f"{row['Tag']} | SN: {row['N_Serie']}" 
-            for _, row in df_ultimos.iterrows() 
-            if str(row['N_Serie']) != 'nan'
-        ]
-        
-        opciones = [""] + sorted(opciones_base)
+        selectores = opciones_motores(df_completo)
+        opciones = selectores["historial"]
         
         params = st.query_params
         qr_valor = params.get("serie") or params.get("tag") or params.get("Serie") or params.get("Tag")
         
         idx_buscador = 0
         if qr_valor:
-            v_qr = str(qr_valor).strip().upper()
-            for i, op in enumerate(opciones):
-                if v_qr in op.upper():
-                    idx_buscador = i
-                    break
-        
-
-        if idx_buscador >= len(opciones):
-            idx_buscador = 0
+            v_qr = normalizar_clave(qr_valor)
+            idx_buscador = selectores["pos_historial"].get(v_qr, 0)
+            if not idx_buscador:
+                # Código parcial: se busca dentro de las opciones
+                idx_buscador = next((i for i, op in enumerate(opciones) if v_qr in op.upper()), 0)
 
         seleccion = st.selectbox(
             "🔍 Seleccione o Busque el Motor:", 
@@ -590,10 +1081,9 @@ elif modo == "Historial y QR":
 
             serie_final = seleccion.split(" | SN: ")[1] if " | SN: " in seleccion else ""
 
-            df_historial = df_completo[df_completo['N_Serie'] == serie_final].copy()
+            df_historial = filas_de_motor(df_completo, 'N_Serie', serie_final).copy()
             
             if not df_historial.empty:
-                df_historial['Fecha_DT'] = pd.to_datetime(df_historial['Fecha'], dayfirst=True, errors='coerce')
                 df_historial = df_historial.sort_values('Fecha_DT', ascending=False)
 
                 motor_info = df_historial.iloc[0]
@@ -603,10 +1093,9 @@ elif modo == "Historial y QR":
                 with st.container(border=True):
                     col_qr, col_info = st.columns([1, 2])
                     url_app = f"https://marpi-motores-mciqbovz6wqnaj9mw7fytb.streamlit.app/?tag={serie_final}"
-                    qr_api = f"https://api.qrserver.com/v1/create-qr-code/?size=200x200&data={url_app}"
                     
                     with col_qr:
-                        st.image(qr_api, width=120) 
+                        st.image(generar_qr_png(url_app), width=120) 
                     with col_info:
                         st.subheader(f"Ⓜ️ {ultimo_tag}")
                         st.info(f"Número de Serie: **{serie_final}**")
@@ -653,7 +1142,28 @@ elif modo == "Historial y QR":
                 st.divider()
                 st.subheader("📜 Historial de Intervenciones")
                 
-                hist_m = df_historial.iloc[:] 
+                clave_pagina = f"hist_mostrar_{serie_final}"
+                if clave_pagina not in st.session_state:
+                    st.session_state[clave_pagina] = HISTORIAL_POR_PAGINA
+                total_hist = len(df_historial)
+
+                hist_m = df_historial.iloc[:st.session_state[clave_pagina]]
+
+                def pedir_impresion(serie, potencia):
+                    st.session_state.etiqueta_a_imprimir = (serie, potencia)
+                    st.session_state.pedidos_impresion = st.session_state.get("pedidos_impresion", 0) + 1
+
+                # Un único componente por página imprime la etiqueta pedida; se
+                # consume el pedido para que no vuelva a imprimir en el próximo rerun
+                pedido = st.session_state.pop("etiqueta_a_imprimir", None)
+                if pedido:
+                    try:
+                        import streamlit.components.v1 as components
+                        components.html(html_impresion_etiqueta(etiqueta_base64(*pedido),
+                                                                st.session_state.get("pedidos_impresion", 0)), height=0)
+                    except Exception as e:
+                        st.error(f"Error en etiqueta: {e}")
+
                 for idx, fila in hist_m.iterrows():
                     f_limpia = fila.fillna('-')
                     tarea = str(f_limpia.get('Tipo_Tarea', '-')).strip()
@@ -709,45 +1219,51 @@ elif modo == "Historial y QR":
                             st.caption(f"**📌 Notas:** {f_limpia.get('Notas')}")
                     st.markdown('</div>', unsafe_allow_html=True) 
 
-                    campos_electricos = ['RT_TU1', 'RT_TV1', 'RT_TW1', 'RB_WV1', 'RB_VU1', 'RB_UW1', 'RI_U1U2', 'RI_V1V2', 'RI_W1W2', 'RI_U1V1', 'RI_V1W1', 'RI_W1U1']
-                    detalles_foto = ""
-                    if "Mediciones" in tarea or "Megado" in tarea:
-                        detalles_foto = "<b>Mediciones Eléctricas:</b><br>"
-                        for i, c in enumerate(campos_electricos):
-                            v = f_limpia.get(c, '-')
-                            if v != '-': detalles_foto += f"{c}: {v} | "
-                            if (i + 1) % 3 == 0: detalles_foto += "<br>"
-                    elif "Lubricación" in tarea or "Relubricacion" in tarea:
-                        detalles_foto = f"<b>Rodamiento LA:</b> {f_limpia.get('Rodamiento_LA')} ({f_limpia.get('Gramos_LA')}g)<br><b>Rodamiento LOA:</b> {f_limpia.get('Rodamiento_LOA')} ({f_limpia.get('Gramos_LOA')}g)"
-                    else:
-                        detalles_foto = f"Rod. LA: {f_limpia.get('Rodamiento_LA', '-')} | Rod. LOA: {f_limpia.get('Rodamiento_LOA', '-')}"
+                    # Reporte y etiqueta (iframes + render) solo se arman si se piden
+                    if st.toggle("📥 Reporte y etiqueta", key=f"acciones_hist_{idx}"):
+                        campos_electricos = ['RT_TU1', 'RT_TV1', 'RT_TW1', 'RB_WV1', 'RB_VU1', 'RB_UW1', 'RI_U1U2', 'RI_V1V2', 'RI_W1W2', 'RI_U1V1', 'RI_V1W1', 'RI_W1U1']
+                        if "Mediciones" in tarea or "Megado" in tarea:
+                            medidas = [f"{c}: {f_limpia.get(c, '-')}" for c in campos_electricos if f_limpia.get(c, '-') != '-']
+                            detalles_rep = ["Mediciones Eléctricas:"] + [" | ".join(medidas[i:i + 3]) for i in range(0, len(medidas), 3)]
+                        elif "Lubricación" in tarea or "Relubricacion" in tarea:
+                            detalles_rep = [
+                                f"Rodamiento LA: {f_limpia.get('Rodamiento_LA')} ({f_limpia.get('Gramos_LA')}g)",
+                                f"Rodamiento LOA: {f_limpia.get('Rodamiento_LOA')} ({f_limpia.get('Gramos_LOA')}g)",
+                            ]
+                        else:
+                            detalles_rep = [f"Rod. LA: {f_limpia.get('Rodamiento_LA', '-')} | Rod. LOA: {f_limpia.get('Rodamiento_LOA', '-')}"]
+
+                        # El PDF se genera recién al hacer clic (y queda cacheado)
+                        st.download_button(
+                            label="📥 GUARDAR REPORTE COMPLETO",
+                            data=partial(
+                                reporte_intervencion_pdf, tag_h, fecha, tarea, resp_h,
+                                str(f_limpia.get('N_Serie', '-')), str(f_limpia.get('Potencia', '-')),
+                                str(f_limpia.get('RPM', '-')), str(f_limpia.get('Carcasa', '-')),
+                                detalles_rep, str(f_limpia.get('Descripcion', '-')),
+                            ),
+                            file_name=f"Reporte_{tag_h}_{fecha.replace('/', '-')}.pdf",
+                            mime="application/pdf",
+                            use_container_width=True,
+                            key=f"rep_hist_{idx}",
+                        )
+
+                        st.button(
+                            "🖨️ IMPRIMIR ETIQUETA HONEYWELL",
+                            on_click=pedir_impresion,
+                            args=(str(f_limpia.get('N_Serie', '-')), str(f_limpia.get('Potencia', '-'))),
+                            use_container_width=True,
+                            key=f"imp_hist_{idx}",
+                        )
+                    st.divider()
 
-                    html_boton = boton_descarga_pro(tag_h, fecha, tarea, resp_h, f_limpia.get('N_Serie', '-'), f_limpia.get('Potencia', '-'), f_limpia.get('RPM', '-'), f_limpia.get('Carcasa', '-'), detalles_foto, "", f_limpia.get('Descripcion', '-'))
-                    components.html(html_boton, height=80)
+                if len(hist_m) < total_hist:
+                    st.caption(f"Mostrando {len(hist_m)} de {total_hist} intervenciones")
 
-                    try:
-                        s_local = str(f_limpia.get('N_Serie', '-'))
-                        p_local = str(f_limpia.get('Potencia', '-'))
-                        img_bytes_h = generar_etiqueta_honeywell(tag_h, s_local, p_local)
-                        if img_bytes_h:
-                            import base64
-                            b64_img_h = base64.b64encode(img_bytes_h).decode('utf-8')
-                            boton_h_html = f"""
-                            <div style="text-align: center; margin-top: -15px;">
-                                <button id="btnH_{idx}" style="width:100%; background:#28a745; color:white; padding:8px; border:none; border-radius:5px; font-weight:bold; cursor:pointer; height:38px; font-size:12px;">🖨️ IMPRIMIR ETIQUETA HONEYWELL</button>
-                            </div>
-                            <script>
-                            document.getElementById('btnH_{idx}').onclick = function() {{
-                                const win = window.open('', '', 'width=800,height=600');
-                                win.document.write('<html><head><style>@page {{ size: 60mm 30mm; margin: 0; }} img {{ width: 60mm; height: 30mm; }}</style></head><body>');
-                                win.document.write('<img src="data:image/png;base64,{b64_img_h}" onload="setTimeout(() => {{ window.print(); window.close(); }}, 500);">');
-                                win.document.write('</body></html>');
-                                win.document.close();
-                            }};
-                            </script>"""
-                            components.html(boton_h_html, height=50)
-                    except: pass
-                    st.divider()
+                    def mostrar_mas(clave=clave_pagina):
+                        st.session_state[clave] += HISTORIAL_POR_PAGINA
+
+                    st.button("⬇️ Cargar más", on_click=mostrar_mas, use_container_width=True, key="btn_mas_hist")
 elif modo == "Relubricacion":
     st.title("🛢️ Lubricación Inteligente MARPI")
 
@@ -764,24 +1280,9 @@ elif modo == "Relubricacion":
     datos_auto = st.session_state.get('datos_motor_auto', {})
     tag_qr = datos_auto.get('tag', '')
 
-    df_lista = df_completo.copy()
-    df_lista['Busqueda_Combo'] = df_lista['Tag'].astype(str) + " | SN: " + df_lista['N_Serie'].astype(str)
-
-    if 'Busqueda_Combo' in df_lista.columns:
-        lista_limpia = df_lista['Busqueda_Combo'].fillna("").astype(str).str.strip()
-    
-        lista_final = [x for x in lista_limpia.unique().tolist() if x != ""]
-
-        opciones_combo = [""] + sorted(lista_final)
-    else:
-        opciones_combo = [""]
-    
-    indice_predef = 0
-    if tag_qr:
-        for i, opt in enumerate(opciones_combo):
-            if opt.startswith(tag_qr):
-                indice_predef = i
-                break
+    selectores = opciones_motores(df_completo)
+    opciones_combo = selectores["relub"]
+    indice_predef = selectores["pos_relub"].get(normalizar_clave(tag_qr), 0) if tag_qr else 0
 
     seleccion_full = st.selectbox(
         "Seleccione el Motor (busque por TAG o N° de Serie)", 
@@ -793,15 +1294,15 @@ elif modo == "Relubricacion":
     tag_seleccionado = seleccion_full.split(" | ")[0].strip() if seleccion_full else ""
 
     if tag_seleccionado:
-        fila_motor = df_lista[df_lista['Tag'] == tag_seleccionado]
-        if not fila_motor.empty:
-            info_motor = fila_motor.iloc[-1]
+        fila_motor = ultima_fila_motor(df_completo, 'Tag', tag_seleccionado)
+        if fila_motor is not None:
+            info_motor = fila_motor
             v_la = str(info_motor.get('Rodamiento_LA', '')).replace('nan', '').upper()
             v_loa = str(info_motor.get('Rodamiento_LOA', '')).replace('nan', '').upper()
             v_serie = str(info_motor.get('N_Serie', '')).replace('nan', '')
 
             st.markdown("---")
-            es_sellado = any(x in v_la or x in v_loa for x in ["2RS", "ZZ"])
+            es_sellado = rodamiento_sellado(v_la) or rodamiento_sellado(v_loa)
             if es_sellado:
                 st.error(f"🚫 **AVISO: RODAMIENTOS SELLADOS ({v_la} / {v_loa}). NO LUBRICAR.**")
             else:
@@ -847,16 +1348,15 @@ elif modo == "Relubricacion":
                     "Notas": notas,
                     "Descripcion": f"LUBRICACIÓN REALIZADA: {grasa_t}"
                 }
-   
-                df_final = pd.concat([df_completo, pd.DataFrame([nueva])], ignore_index=True)
-                conn.update(data=df_final)
+
+                # Queda en la cola local; el envío a Sheets se hace en segundo plano
+                encolar_fila(HOJA_PRINCIPAL, nueva)
 
                 st.success(f"✅ ¡Registro de {tag_seleccionado} guardado!")
                 st.balloons()
-                st.cache_data.clear()
                 st.session_state.form_id += 1
-                import time
-                time.sleep(2)
+                with medicion.tramo("espera", "pausa tras guardar"):
+                    time.sleep(2)
                 st.rerun()
             else:
                 st.error("⚠️ Falta seleccionar el Motor o ingresar el Técnico.")
@@ -898,9 +1398,9 @@ elif modo == "Mediciones de Campo":
     n_serie_sug = serie_inicial
     if tag_inicial and not n_serie_sug:
         if not df_completo.empty:
-            busq = df_completo[df_completo['Tag'] == tag_inicial].tail(1)
-            if not busq.empty: 
-                n_serie_sug = str(busq['N_Serie'].values[0])
+            busq = ultima_fila_motor(df_completo, 'Tag', tag_inicial)
+            if busq is not None and pd.notna(busq['N_Serie']):
+                n_serie_sug = busq['N_Serie']
 
     with st.form(f"form_megado_{st.session_state.cnt_meg}"):
         col1, col2, col3 = st.columns(3)
@@ -950,8 +1450,8 @@ elif modo == "Mediciones de Campo":
         
         if submitted:
             if t and resp:
-                busqueda = df_completo[df_completo['Tag'] == t].tail(1)
-                info = busqueda.iloc[0].to_dict() if not busqueda.empty else {}
+                busqueda = ultima_fila_motor(df_completo, 'Tag', t)
+                info = busqueda.to_dict() if busqueda is not None else {}
                 
                 nueva_fila = {
                     "Fecha": fecha_hoy.strftime("%d/%m/%Y"),
@@ -968,15 +1468,14 @@ elif modo == "Mediciones de Campo":
                     "ML_L1L2": l1l2, "ML_L1L3": l1l3, "ML_L2L3": l2l3
                 }
 
-                df_final = pd.concat([df_completo, pd.DataFrame([nueva_fila])], ignore_index=True)
-                conn.update(data=df_final) 
+                # Queda en la cola local; el envío a Sheets se hace en segundo plano
+                encolar_fila(HOJA_PRINCIPAL, nueva_fila)
 
-                st.cache_data.clear()
                 st.success(f"✅ ¡Todo guardado! Reporte listo para {t}")
                 st.balloons()
 
-                import time
-                time.sleep(1.5)
+                with medicion.tramo("espera", "pausa tras guardar"):
+                    time.sleep(1.5)
                 st.rerun()
             else:
                 st.error("⚠️ Falta TAG o Responsable.")
@@ -992,6 +1491,8 @@ elif modo == "Mediciones de Campo":
 st.markdown("---")
 st.caption("Sistema desarrollado y diseñado por Heber Ortiz | Marpi Electricidad ⚡")
 
+terminar_medicion()
+
 
 
 
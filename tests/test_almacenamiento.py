@@ -0,0 +1,252 @@
+import os
+
+import pytest
+
+import almacenamiento
+from benchmarks.conexion_falsa import ConexionFalsa
+
+ENCABEZADOS = ["Fecha", "Tag", "N_Serie"]
+FILAS = [
+    ["01/01/2026", "M1", "SN1"],
+    ["02/01/2026", "M2", "SN2"],
+    ["03/01/2026", "M1", "SN1"],
+]
+
+
+@pytest.fixture(params=["csv", "parquet"])
+def almacen(request, tmp_path):
+    alm = almacenamiento.AlmacenArchivos(str(tmp_path / "datos"), request.param)
+    alm.agregar_filas("Sheet1", [ENCABEZADOS] + FILAS)
+    return alm
+
+
+def test_formato_desconocido(tmp_path):
+    with pytest.raises(ValueError):
+        almacenamiento.AlmacenArchivos(str(tmp_path), "xlsx")
+
+
+def test_ruta_por_hoja(tmp_path):
+    alm = almacenamiento.AlmacenArchivos(str(tmp_path), "parquet")
+    assert alm.ruta("Planificación") == os.path.join(str(tmp_path), "Planificación.parquet")
+    assert alm.ruta("Hoja 1/2") == os.path.join(str(tmp_path), "Hoja_1_2.parquet")
+
+
+def test_hoja_inexistente(tmp_path):
+    alm = almacenamiento.AlmacenArchivos(str(tmp_path))
+    assert alm.leer("Nada").empty
+    assert alm.encabezados("Nada") == []
+    assert alm.filas_desde("Nada", 2) == []
+    assert alm.marca("Nada") is None
+
+
+def test_leer_infiere_tipos(almacen):
+    almacen.agregar_filas("Numeros", [["Tag", "RPM"], ["M1", 1500], ["M2", None]])
+    df = almacen.leer("Numeros")
+    assert df["RPM"].dtype.kind == "f"
+    assert df["RPM"].iloc[0] == 1500
+    assert df["RPM"].isna().iloc[1]
+
+
+def test_lecturas_con_numeracion_de_planilla(almacen):
+    # Filas desde 1 con el encabezado; columnas desde 0
+    assert almacen.encabezados("Sheet1") == ENCABEZADOS
+    assert almacen.fila("Sheet1", 2) == FILAS[0]
+    assert almacen.fila("Sheet1", 99) == []
+    assert almacen.filas_desde("Sheet1", 3) == FILAS[1:]
+    assert almacen.columna("Sheet1", 1) == ["Tag", "M1", "M2", "M1"]
+    assert almacen.leer("Sheet1")["Tag"].tolist() == ["M1", "M2", "M1"]
+
+
+def test_agregar_filas_convierte_a_texto(almacen):
+    almacen.agregar_filas("Sheet1", [["04/01/2026", 7, None]])
+    assert almacen.fila("Sheet1", 5) == ["04/01/2026", "7", ""]
+
+
+def test_escribir_encabezados_extiende_sin_tocar_las_filas(almacen):
+    almacen.escribir_encabezados("Sheet1", ENCABEZADOS + ["Notas"])
+    almacen.agregar_filas("Sheet1", [["04/01/2026", "M3", "SN3", "nueva"]])
+    assert almacen.encabezados("Sheet1") == ENCABEZADOS + ["Notas"]
+    df = almacen.leer("Sheet1")
+    assert df["Tag"].tolist() == ["M1", "M2", "M1", "M3"]
+    assert df["Notas"].isna().tolist() == [True, True, True, False]
+
+
+def test_borrar_filas_indices_desde_cero_con_encabezado(almacen):
+    # Índice 1 es la primera fila de datos, como en deleteDimension de Sheets
+    almacen.borrar_filas("Sheet1", [3, 1])
+    assert almacen.encabezados("Sheet1") == ENCABEZADOS
+    assert almacen.filas_desde("Sheet1", 2) == [FILAS[1]]
+
+
+def test_csv_agrega_al_final_y_parquet_reescribe(almacen):
+    inodo = os.stat(almacen.ruta("Sheet1")).st_ino
+    almacen.agregar_filas("Sheet1", [["04/01/2026", "M3", "SN3"]])
+    mismo_archivo = os.stat(almacen.ruta("Sheet1")).st_ino == inodo
+    assert mismo_archivo is (almacen.formato == "csv")
+    assert not os.path.exists(almacen.ruta("Sheet1") + ".tmp")
+
+
+def test_marca(almacen):
+    marca = almacen.marca("Sheet1")
+    info = os.stat(almacen.ruta("Sheet1"))
+    assert marca == f"{info.st_mtime_ns}-{info.st_size}"
+    almacen.agregar_filas("Sheet1", [["04/01/2026", "M3", "SN3"]])
+    assert almacen.marca("Sheet1") != marca
+
+
+def test_verificar(almacen):
+    base = almacen.marca("Sheet1")
+    almacen.verificar("Sheet1", base)
+    almacen.borrar_filas("Sheet1", [1])
+    with pytest.raises(almacenamiento.Conflicto) as error:
+        almacen.verificar("Sheet1", base)
+    assert error.value.hoja == "Sheet1"
+    assert error.value.base == base
+
+
+class AlmacenEspiado(almacenamiento.AlmacenArchivos):
+    """Anota en `llamadas` cada verificación y cada escritura, en orden."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.llamadas = []
+
+    def verificar(self, hoja, base):
+        self.llamadas.append("verificar")
+        super().verificar(hoja, base)
+
+    def escribir_encabezados(self, hoja, encabezados):
+        self.llamadas.append("escribir_encabezados")
+        super().escribir_encabezados(hoja, encabezados)
+
+    def borrar_filas(self, hoja, indices):
+        self.llamadas.append("borrar_filas")
+        super().borrar_filas(hoja, indices)
+
+    def agregar_filas(self, hoja, filas):
+        self.llamadas.append("agregar_filas")
+        super().agregar_filas(hoja, filas)
+
+
+@pytest.fixture(params=["csv", "parquet"])
+def espiado(request, tmp_path):
+    carpeta = str(tmp_path / "datos")
+    almacenamiento.AlmacenArchivos(carpeta, request.param).agregar_filas("Sheet1", [ENCABEZADOS] + FILAS)
+    # Otro proceso sobre la misma carpeta: su bloqueo no es el nuestro
+    otro = almacenamiento.AlmacenArchivos(carpeta, request.param)
+    return AlmacenEspiado(carpeta, request.param), otro
+
+
+def _reemplazar_motor(tag, fila):
+    """Como agregar_filas(..., reemplazar={"Tag": [tag]}) de la app."""
+    def armar(alm):
+        columna = alm.columna("Sheet1", ENCABEZADOS.index("Tag"))
+        return {"encabezados": None, "borrar": [i for i, v in enumerate(columna) if i > 0 and v == tag],
+                "agregar": [fila]}
+    return armar
+
+
+def test_escribir_sin_conflicto(espiado):
+    alm, _ = espiado
+    cambios = almacenamiento.escribir(alm, "Sheet1", _reemplazar_motor("M1", ["04/01/2026", "M1", "SN9"]))
+    assert cambios["borrar"] == [1, 3]
+    assert alm.llamadas == ["verificar", "borrar_filas", "agregar_filas"]
+    assert alm.filas_desde("Sheet1", 2) == [FILAS[1], ["04/01/2026", "M1", "SN9"]]
+
+
+def test_escribir_vuelve_a_armar_sobre_la_version_nueva(espiado):
+    alm, otro = espiado
+    armar = _reemplazar_motor("M1", ["04/01/2026", "M1", "SN9"])
+    vueltas = []
+
+    def armar_con_otro_en_el_medio(almacen):
+        cambios = armar(almacen)
+        vueltas.append(cambios["borrar"])
+        if len(vueltas) == 1:
+            # Entre armar y verificar otro borra la fila de M2 y agrega un M3:
+            # los índices armados en la primera vuelta ya no sirven
+            otro.borrar_filas("Sheet1", [2])
+            otro.agregar_filas("Sheet1", [["03/01/2026", "M3", "SN3"]])
+        return cambios
+
+    almacenamiento.escribir(alm, "Sheet1", armar_con_otro_en_el_medio)
+
+    assert vueltas == [[1, 3], [1, 2]]
+    # Nada se escribió antes de la verificación que pasó
+    assert alm.llamadas == ["verificar", "verificar", "borrar_filas", "agregar_filas"]
+    assert alm.filas_desde("Sheet1", 2) == [["03/01/2026", "M3", "SN3"], ["04/01/2026", "M1", "SN9"]]
+
+
+def test_escribir_agota_los_reintentos_sin_escribir(espiado):
+    alm, otro = espiado
+    armar = _reemplazar_motor("M1", ["04/01/2026", "M1", "SN9"])
+    ajenas = []
+
+    def armar_siempre_con_conflicto(almacen):
+        cambios = armar(almacen)
+        ajena = [f"0{len(ajenas) + 5}/01/2026", "M7", "SN7"]
+        otro.agregar_filas("Sheet1", [ajena])
+        ajenas.append(ajena)
+        return cambios
+
+    with pytest.raises(almacenamiento.Conflicto):
+        almacenamiento.escribir(alm, "Sheet1", armar_siempre_con_conflicto, reintentos=3)
+
+    assert len(ajenas) == 3
+    assert alm.llamadas == ["verificar"] * 3
+    # La hoja queda con lo de los otros y nada propio
+    assert alm.filas_desde("Sheet1", 2) == FILAS + ajenas
+
+
+def test_escribir_con_encabezados_nuevos(espiado):
+    alm, _ = espiado
+
+    def armar(almacen):
+        encabezados = almacen.encabezados("Sheet1") + ["Notas"]
+        return {"encabezados": encabezados, "borrar": [], "agregar": [["04/01/2026", "M3", "SN3", "ok"]]}
+
+    almacenamiento.escribir(alm, "Sheet1", armar)
+    assert alm.llamadas == ["verificar", "escribir_encabezados", "agregar_filas"]
+    assert alm.leer("Sheet1")["Notas"].tolist()[-1] == "ok"
+
+
+def test_gsheets_encabezados_agrandan_la_grilla():
+    conexion = ConexionFalsa({"Sheet1": [ENCABEZADOS] + FILAS})
+    alm = almacenamiento.AlmacenGSheets(lambda: conexion)
+    ancho = conexion.hojas["Sheet1"].col_count
+    alm.escribir_encabezados("Sheet1", ENCABEZADOS)
+    assert conexion.llamadas["add_cols"] == 0
+    nuevos = ENCABEZADOS + [f"Extra_{i}" for i in range(ancho)]
+    alm.escribir_encabezados("Sheet1", nuevos)
+    assert conexion.hojas["Sheet1"].col_count == len(nuevos)
+    assert alm.encabezados("Sheet1") == nuevos
+
+
+def test_leer_sin_filas_en_blanco_y_con_su_posicion(almacen):
+    almacen.agregar_filas("Sheet1", [["", "", ""], ["04/01/2026", "M3", "SN3"]])
+    df = almacen.leer("Sheet1")
+    assert df["Tag"].tolist() == ["M1", "M2", "M1", "M3"]
+    # La fila 6 de la planilla tiene índice 4
+    assert df.index.tolist() == [0, 1, 2, 4]
+
+
+def test_gsheets_agregar_con_un_hueco_no_pisa_filas():
+    conexion = ConexionFalsa({"Sheet1": [ENCABEZADOS, FILAS[0], ["", "", ""]] + FILAS[1:]})
+    alm = almacenamiento.AlmacenGSheets(lambda: conexion)
+    nuevas = [["04/01/2026", "M3", "SN3"], ["05/01/2026", "M4", "SN4"]]
+    alm.agregar_filas("Sheet1", nuevas)
+    # Sheets las pone en el hueco, pero insertadas: lo que seguía queda
+    assert [f for f in alm.filas_desde("Sheet1", 2) if any(f)] == [FILAS[0]] + nuevas + FILAS[1:]
+
+
+def test_escribir_un_append_no_verifica(espiado):
+    alm, otro = espiado
+
+    def armar(almacen):
+        # Otro escribe en el medio (en el libro de Sheets, también en otra hoja)
+        otro.agregar_filas("Sheet1", [["04/01/2026", "M7", "SN7"]])
+        return {"encabezados": None, "borrar": [], "agregar": [["05/01/2026", "M3", "SN3"]]}
+
+    almacenamiento.escribir(alm, "Sheet1", armar, reintentos=1)
+    assert alm.llamadas == ["agregar_filas"]
+    assert alm.filas_desde("Sheet1", 2) == FILAS + [["04/01/2026", "M7", "SN7"], ["05/01/2026", "M3", "SN3"]]
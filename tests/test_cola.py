@@ -0,0 +1,172 @@
+import json
+import os
+
+import pytest
+from gspread.exceptions import APIError
+
+import almacenamiento
+from cola import ColaEnvios
+
+
+class _Respuesta:
+    def __init__(self, estado):
+        self.status_code = estado
+        self.text = f"HTTP {estado}"
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": f"HTTP {self.status_code}"}}
+
+
+class HojaFalsa:
+    """enviar() de la cola: agrega las filas salvo las de Tags marcados.
+
+    `malos` son Tags que la API rechaza con un 400; `caida` es una excepción
+    que se levanta en cualquier envío mientras esté puesta.
+    """
+
+    def __init__(self):
+        self.filas = []
+        self.malos = set()
+        self.caida = None
+        self.pedidos = 0
+
+    def __call__(self, hoja, filas):
+        self.pedidos += 1
+        if self.caida is not None:
+            raise self.caida
+        if any(f["Tag"] in self.malos for f in filas):
+            raise APIError(_Respuesta(400))
+        self.filas.extend(f["Tag"] for f in filas)
+
+
+@pytest.fixture
+def hoja():
+    return HojaFalsa()
+
+
+@pytest.fixture
+def cola(tmp_path, hoja):
+    return ColaEnvios(str(tmp_path / "cola"), hoja, max_intentos=3)
+
+
+def _encolar(cola, *tags):
+    return [cola.encolar("Sheet1", {"Tag": t}) for t in tags]
+
+
+def _leer(cola, nombre):
+    with open(os.path.join(cola.carpeta, nombre), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("error, rechazo", [
+    (APIError(_Respuesta(400)), True),
+    (APIError(_Respuesta(403)), True),
+    (APIError(_Respuesta(404)), True),
+    (APIError(_Respuesta(429)), False),
+    (APIError(_Respuesta(500)), False),
+    (APIError(_Respuesta(503)), False),
+    (ConnectionError("sin red"), False),
+    (TimeoutError(), False),
+    (almacenamiento.Conflicto("Sheet1", "1", "2"), False),
+])
+def test_es_rechazo(error, rechazo):
+    assert almacenamiento.es_rechazo(error) is rechazo
+
+
+def test_vaciar_en_orden(cola, hoja):
+    _encolar(cola, "M1", "M2", "M3")
+    assert cola.vaciar() == 3
+    assert hoja.filas == ["M1", "M2", "M3"]
+    assert hoja.pedidos == 1
+    assert cola.pendientes() == []
+
+
+def test_lotes_por_hoja_y_aviso(tmp_path, hoja):
+    avisos = []
+    cola = ColaEnvios(str(tmp_path / "cola"), hoja, al_enviar=avisos.append)
+    cola.encolar("Sheet1", {"Tag": "M1"})
+    cola.encolar("Planificación", {"Tag": "OT1"})
+    cola.encolar("Sheet1", {"Tag": "M2"})
+    assert cola.vaciar() == 3
+    assert avisos == ["Sheet1", "Planificación", "Sheet1"]
+
+
+@pytest.mark.parametrize("caida", [
+    ConnectionError("sin red"),
+    TimeoutError(),
+    APIError(_Respuesta(429)),
+    APIError(_Respuesta(503)),
+    almacenamiento.Conflicto("Sheet1", "1", "2"),
+])
+def test_caida_no_cuenta_como_rechazo(cola, hoja, caida):
+    nombres = _encolar(cola, "M1", "M2")
+    hoja.caida = caida
+    # Más vueltas que max_intentos: nada se aparta ni se anota
+    for _ in range(cola.max_intentos + 2):
+        with pytest.raises(type(caida)):
+            cola.vaciar()
+    assert cola.pendientes() == nombres
+    assert cola.rechazados() == []
+    assert "intentos" not in _leer(cola, nombres[0])
+
+    hoja.caida = None
+    assert cola.vaciar() == 2
+    assert hoja.filas == ["M1", "M2"]
+
+
+def test_rechazado_se_aparta_y_el_resto_sigue(cola, hoja):
+    malo = _encolar(cola, "MALO", "M1", "M2")[0]
+    hoja.malos = {"MALO"}
+    for intento in range(1, cola.max_intentos):
+        with pytest.raises(APIError):
+            cola.vaciar()
+        assert _leer(cola, malo)["intentos"] == intento
+        assert hoja.filas == []
+
+    assert cola.vaciar() == 2
+    assert hoja.filas == ["M1", "M2"]
+    assert cola.pendientes() == []
+    rechazados = cola.rechazados()
+    assert [r["nombre"] for r in rechazados] == [malo]
+    assert rechazados[0]["intentos"] == cola.max_intentos
+    assert rechazados[0]["fila"] == {"Tag": "MALO"}
+    assert "400" in rechazados[0]["error"]
+
+
+def test_rechazo_detras_de_envios_buenos(cola, hoja):
+    _encolar(cola, "M1", "MALO", "M2")
+    hoja.malos = {"MALO"}
+    # El lote falla, el primero solo pasa; después el rechazado frena la cola
+    with pytest.raises(APIError):
+        cola.vaciar()
+    assert hoja.filas == ["M1"]
+    assert len(cola.pendientes()) == 2
+
+
+def test_reintentar_rechazados(cola, hoja):
+    malo = _encolar(cola, "MALO", "M1")[0]
+    hoja.malos = {"MALO"}
+    for _ in range(cola.max_intentos):
+        try:
+            cola.vaciar()
+        except APIError:
+            pass
+    assert [r["nombre"] for r in cola.rechazados()] == [malo]
+
+    hoja.malos = set()
+    cola.reintentar_rechazados()
+    assert cola.rechazados() == []
+    assert cola.pendientes() == [malo]
+    assert "intentos" not in _leer(cola, malo)
+    assert cola.vaciar() == 1
+    assert hoja.filas == ["M1", "MALO"]
+
+
+def test_envio_sobrevive_al_proceso(tmp_path, hoja):
+    carpeta = str(tmp_path / "cola")
+    ColaEnvios(carpeta, hoja).encolar("Sheet1", {"Tag": "M1", "RPM": 1500})
+    # Otro proceso (p. ej. tras un reinicio) encuentra el envío en disco
+    otra = ColaEnvios(carpeta, hoja)
+    assert otra.vaciar() == 1
+    assert hoja.filas == ["M1"]
+    assert not any(n.endswith(".tmp") for n in os.listdir(carpeta))
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from hojas import filas_a_dataframe, normalizar_clave, normalizar_datos
+
+
+@pytest.mark.parametrize("valor", ["", "nan", "NaN", "None", "-", " - ", "S/D", "s/d"])
+def test_textos_sin_dato_pasan_a_nulos(valor):
+    df = normalizar_datos(pd.DataFrame({"Notas": [valor, "ok"]}))
+    assert pd.isna(df["Notas"].iloc[0])
+    assert df["Notas"].iloc[1] == "ok"
+
+
+@pytest.mark.parametrize("valor", ["0", "S/S", "SD", "--", "no"])
+def test_otros_textos_se_conservan(valor):
+    df = normalizar_datos(pd.DataFrame({"Notas": [valor]}))
+    assert df["Notas"].iloc[0] == valor
+
+
+def test_columnas_numericas_no_se_tocan():
+    df = normalizar_datos(pd.DataFrame({"RPM": [1500.0, np.nan]}))
+    assert df["RPM"].iloc[0] == 1500.0
+    assert df["RPM"].dtype.kind == "f"
+
+
+@pytest.mark.parametrize("columna, crudos, normalizados", [
+    ("Tag", [" m-01 ", "b2", "-"], ["M-01", "B2", None]),
+    # Series que llegan como número: sin ".0"
+    ("N_Serie", [12345.0, np.nan, 7.0], ["12345", None, "7"]),
+    ("N_Serie", ["weg 100", "S/D", None], ["WEG 100", None, None]),
+])
+def test_claves_de_motor(columna, crudos, normalizados):
+    df = normalizar_datos(pd.DataFrame({columna: crudos}))
+    assert [None if pd.isna(v) else v for v in df[columna]] == normalizados
+
+
+def test_fecha_dt_dia_primero():
+    df = normalizar_datos(pd.DataFrame({"Fecha": ["03/02/2026", "no es fecha", "-"]}))
+    assert df["Fecha_DT"].iloc[0] == pd.Timestamp("2026-02-03")
+    assert df["Fecha_DT"].iloc[1:].isna().all()
+    # Fecha queda como texto; la columna derivada es aparte
+    assert df["Fecha"].iloc[0] == "03/02/2026"
+
+
+def test_sin_fecha_no_agrega_fecha_dt():
+    assert "Fecha_DT" not in normalizar_datos(pd.DataFrame({"Tag": ["M1"]})).columns
+
+
+def test_no_modifica_la_entrada():
+    crudo = pd.DataFrame({"Tag": [" m1 "], "Notas": ["-"]})
+    normalizar_datos(crudo)
+    assert crudo["Tag"].iloc[0] == " m1 "
+    assert crudo["Notas"].iloc[0] == "-"
+
+
+def test_idempotente():
+    crudo = pd.DataFrame({"Fecha": ["03/02/2026"], "Tag": [" m1 "], "N_Serie": [12.0], "Notas": ["S/D"]})
+    una = normalizar_datos(crudo)
+    pd.testing.assert_frame_equal(normalizar_datos(una), una)
+
+
+def test_normalizar_clave():
+    assert normalizar_clave("  weg 100 ") == "WEG 100"
+
+
+def test_filas_a_dataframe_toma_columnas_y_tipos_de_la_base():
+    base = normalizar_datos(pd.DataFrame({"Fecha": ["01/01/2026"], "Tag": ["M1"], "RPM": [1500.0]}))
+    nuevas = filas_a_dataframe([["02/01/2026", "M2", "3000"], ["03/01/2026", "M3"]], base)
+    assert list(nuevas.columns) == ["Fecha", "Tag", "RPM"]
+    assert nuevas["RPM"].tolist()[0] == 3000.0
+    # Filas cortas (celdas vacías al final) se completan con nulos
+    assert pd.isna(nuevas["RPM"].iloc[1])
@@ -0,0 +1,153 @@
+import pandas as pd
+import pytest
+
+import rodamientos
+
+
+@pytest.mark.parametrize("designacion, codigo, sellado, medidas", [
+    ("6315", "6315", False, (75, 160, 37)),
+    ("6310 C3", "6310", False, (50, 110, 27)),
+    ("22220", "22220", False, (100, 180, 46)),
+    ("6205-2RS", "6205", True, (25, 52, 15)),
+    ("62052RS", "6205", True, (25, 52, 15)),
+    ("6205ZZ", "6205", True, (25, 52, 15)),
+    ("6205-RS", "6205", False, (25, 52, 15)),
+    # Rodillos cilíndricos de series 2, 3 y 10: medidas del rígido de bolas equivalente
+    ("NU215 ECP", "6215", False, (75, 130, 25)),
+    ("NJ312", "6312", False, (60, 130, 31)),
+    ("NU1015", "6015", False, (75, 115, 20)),
+    # Series anchas: sin equivalente, quedan fuera del catálogo
+    ("NU2215", "NU2215", False, None),
+    ("7310BECBP", "6310", False, (50, 110, 27)),
+    ("6405", "6405", False, None),
+    ("215", None, False, None),
+    ("S/D", None, False, None),
+])
+def test_identificar(designacion, codigo, sellado, medidas):
+    assert rodamientos.identificar(designacion) == (codigo, sellado, medidas)
+
+
+@pytest.mark.parametrize("designacion, sellado", [
+    ("6205-2RS", True),
+    ("6205 2Z", True),
+    ("6205ZZ", True),
+    ("6206-2RSH", True),
+    ("6205LLU", True),
+    ("6205-RS", False),
+    ("6205-Z", False),
+    ("6205", False),
+    ("", False),
+])
+def test_es_sellado(designacion, sellado):
+    assert rodamientos.es_sellado(designacion) is sellado
+
+
+@pytest.mark.parametrize("designacion, gramos", [
+    # Catálogo: 0,005 · D · B, mínimo 5 g
+    ("6315", 29.6),
+    ("6316 C3", 33.1),
+    ("6205", 5),
+    ("22220", 41.4),
+    ("NU215 ECP", 16.2),
+    ("6205-RS", 5),
+    # Sellados y vacíos
+    ("6205-2RS", 0),
+    ("6205ZZ", 0),
+    ("", 0),
+    (None, 0),
+    ("S/D", 0),
+    ("-", 0),
+    ("sin dato", 0),
+    # Fuera del catálogo: estimación por serie y tamaño
+    ("6405", 6.0),
+    ("NU2215", 22.5),
+    ("NU415", 18.0),
+])
+def test_calcular_grasa_marpi(designacion, gramos):
+    assert rodamientos.calcular_grasa_marpi(designacion) == pytest.approx(gramos)
+
+
+def test_calcular_grasa_lote_igual_al_calculo_por_valor():
+    serie = pd.Series(["6315", None, "6205-2RS", "NU2215", "6315"], index=[10, 11, 12, 13, 14])
+    lote = rodamientos.calcular_grasa_lote(serie)
+    assert lote.index.tolist() == serie.index.tolist()
+    assert lote.tolist() == [29.6, 0, 0, 22.5, 29.6]
+
+
+HOY = pd.Timestamp("2026-06-01")
+
+
+def _fila(tag, dias, tarea, la, loa, rpm="1500", gramos_la=None, gramos_loa=None):
+    return {"Tag": tag, "N_Serie": f"SN-{tag}", "Fecha_DT": HOY - pd.Timedelta(days=dias), "Tipo_Tarea": tarea,
+            "Rodamiento_LA": la, "Rodamiento_LOA": loa, "RPM": rpm,
+            "Gramos_LA": gramos_la, "Gramos_LOA": gramos_loa}
+
+
+@pytest.fixture
+def flota():
+    return pd.DataFrame([
+        _fila("A", 400, "Nuevo Registro", "6315", "6315"),
+        _fila("A", 100, "Relubricacion", None, None),
+        _fila("B", 50, "Nuevo Registro", "6205-2RS", "6205ZZ"),
+        _fila("C", 60, "Relubricacion", "22220", "6205-2RS"),
+        _fila("D", 10, "Nuevo Registro", "6310 C3", "XYZ"),
+        _fila("E", 330, "Relubricacion", "6205", "NU2215", rpm="3000"),
+    ])
+
+
+@pytest.mark.parametrize("tag, lado, gramos, intervalo, dias_restantes, estado", [
+    # Catálogo, K=10: relubricado hace 100 días con un intervalo de 324
+    ("A", "LA", 29.6, 324, 224, "Al día"),
+    ("A", "LOA", 29.6, 324, 224, "Al día"),
+    # Rodillos a rótula, K=1
+    ("C", "LA", 41.4, 22, -38, "Vencido"),
+    # Dentro de los DIAS_AVISO
+    ("E", "LA", 5.0, 347, 17, "Próximo"),
+    # Fuera del catálogo: d sale del código, K=5 por rodillos cilíndricos
+    ("E", "LOA", 22.5, 50, -280, "Vencido"),
+    # Nunca relubricado
+    ("D", "LA", 14.9, 365, pd.NA, "Sin registro"),
+])
+def test_plan_relubricacion(flota, tag, lado, gramos, intervalo, dias_restantes, estado):
+    plan = rodamientos.plan_relubricacion(flota, HOY).set_index(["Tag", "Lado"])
+    fila = plan.loc[(tag, lado)]
+    assert fila["Gramos"] == pytest.approx(gramos)
+    assert fila["Intervalo_dias"] == intervalo
+    if dias_restantes is pd.NA:
+        assert pd.isna(fila["Dias_restantes"])
+    else:
+        assert fila["Dias_restantes"] == dias_restantes
+    assert fila["Estado"] == estado
+
+
+def test_plan_relubricacion_excluye_sellados_y_desconocidos(flota):
+    plan = rodamientos.plan_relubricacion(flota, HOY)
+    pares = set(zip(plan["Tag"], plan["Lado"]))
+    assert "B" not in set(plan["Tag"])
+    assert ("C", "LOA") not in pares
+    assert ("D", "LOA") not in pares
+
+
+def test_plan_relubricacion_ordena_vencidos_primero_y_sin_registro_al_final(flota):
+    plan = rodamientos.plan_relubricacion(flota, HOY)
+    assert plan["Dias_restantes"].dropna().is_monotonic_increasing
+    assert plan["Estado"].iloc[-1] == "Sin registro"
+
+
+def test_plan_relubricacion_sin_datos():
+    plan = rodamientos.plan_relubricacion(pd.DataFrame(), HOY)
+    assert plan.empty
+    assert "Estado" in plan.columns
+
+
+@pytest.mark.parametrize("rpm, diam_int, factor, dias", [
+    # tf = K · (14e6 / (n · √d) − 4d) h, en días de 24 h
+    (1500, 75, 10, 324),
+    (1500, 100, 1, 22),
+    (3000, 25, 10, 347),
+    # Piso de 7 días y tope de INTERVALO_MAX_DIAS
+    (3000, 150, 1, 7),
+    (300, 25, 10, rodamientos.INTERVALO_MAX_DIAS),
+])
+def test_intervalo_relubricacion_dias(rpm, diam_int, factor, dias):
+    assert rodamientos.intervalo_relubricacion_dias([rpm], [diam_int], [factor]).iloc[0] == dias
@@ -0,0 +1,261 @@
+import pytest
+
+import almacenamiento
+from benchmarks.conexion_falsa import ConexionFalsa
+from benchmarks.datos_sinteticos import filas_sheet1
+from sincronizacion import CopiaHoja
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def libro():
+    return ConexionFalsa({"Sheet1": filas_sheet1(100)})
+
+
+@pytest.fixture
+def alm(libro):
+    return almacenamiento.AlmacenGSheets(lambda: libro)
+
+
+@pytest.fixture
+def reloj():
+    return Reloj()
+
+
+@pytest.fixture
+def copia(reloj):
+    avisos = []
+    copia = CopiaHoja("Sheet1", reloj=reloj, al_recargar=lambda df: avisos.append(("recarga", len(df))),
+                      al_agregar=lambda df: avisos.append(("agregar", len(df))))
+    copia.avisos = avisos
+    return copia
+
+
+def _hoja(libro):
+    return libro.hojas["Sheet1"].filas
+
+
+def _fila(libro, tag):
+    fila = list(_hoja(libro)[1])
+    fila[1] = tag
+    return fila
+
+
+def _series(df):
+    return df["Tag"].tolist()
+
+
+def test_primera_vez_lee_la_hoja_entera(libro, alm, copia):
+    df = copia.sincronizar(alm)
+    assert len(df) == 100
+    assert copia.filas == 101
+    assert copia.ultima_fila == _hoja(libro)[100]
+    assert libro.llamadas["read"] == 1
+    assert copia.avisos == [("recarga", 100)]
+
+
+def test_sin_cambios_solo_mira_la_marca(libro, alm, copia):
+    primera = copia.sincronizar(alm)
+    libro.llamadas.clear()
+    assert copia.sincronizar(alm) is primera
+    assert dict(libro.llamadas) == {"drive_last_update": 1}
+
+
+def test_filas_nuevas_se_agregan_sin_releer(libro, alm, copia):
+    version = copia.sincronizar(alm).attrs["version"]
+    libro.llamadas.clear()
+    alm.agregar_filas("Sheet1", [_fila(libro, "NUEVO-1"), _fila(libro, "NUEVO-2")])
+
+    df = copia.sincronizar(alm)
+    assert libro.llamadas["read"] == 0
+    assert libro.llamadas["get"] == 1
+    assert len(df) == 102
+    assert _series(df)[-2:] == ["NUEVO-1", "NUEVO-2"]
+    assert df.index[-1] == 101
+    assert df.attrs["version"] == version + 1
+    assert copia.avisos[-1] == ("agregar", 2)
+
+
+def test_fila_vaciada_a_mano_no_duplica_filas(libro, alm, copia):
+    # Fila 51 de la planilla vaciada a mano: leer() no la trae
+    _hoja(libro)[50] = [""] * len(_hoja(libro)[0])
+    df = copia.sincronizar(alm)
+    assert len(df) == 99
+    # El hueco se borró en la recarga, como la reescritura completa de antes
+    assert len(_hoja(libro)) == 100
+    assert all(any(f) for f in _hoja(libro))
+
+    alm.agregar_filas("Sheet1", [_fila(libro, "NUEVO-1")])
+    df = copia.sincronizar(alm)
+    assert len(df) == len(_hoja(libro)) - 1 == 100
+    assert _series(df)[-1] == "NUEVO-1"
+    assert _series(df).count("NUEVO-1") == 1
+
+
+class ConexionSinBorrar(ConexionFalsa):
+    """La hoja no deja borrar filas (p. ej. protegida)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.planilla.batch_update = self._rechazar
+
+    def _rechazar(self, cuerpo):
+        raise PermissionError("hoja protegida")
+
+
+def test_con_hueco_que_no_se_puede_borrar_cuenta_filas_de_la_hoja(reloj):
+    libro = ConexionSinBorrar({"Sheet1": filas_sheet1(100)})
+    alm = almacenamiento.AlmacenGSheets(lambda: libro)
+    _hoja(libro)[50] = [""] * len(_hoja(libro)[0])
+    copia = CopiaHoja("Sheet1", reloj=reloj)
+
+    df = copia.sincronizar(alm)
+    assert len(df) == 99
+    assert copia.filas == 101
+    assert 49 not in df.index
+
+    # Una fila agregada por otro al final: llega una sola vez
+    _hoja(libro).append(_fila(libro, "NUEVO-1"))
+    libro.marca += 1
+    df = copia.sincronizar(alm)
+    assert len(df) == 100
+    assert _series(df).count("NUEVO-1") == 1
+    assert copia.filas == 102
+
+
+def test_filas_en_blanco_debajo_de_la_ultima_se_saltean(libro, alm, copia):
+    copia.sincronizar(alm)
+    vacia = [""] * len(_hoja(libro)[0])
+    _hoja(libro).extend([vacia, _fila(libro, "NUEVO-1"), vacia])
+    libro.marca += 1
+
+    df = copia.sincronizar(alm)
+    assert _series(df)[-1] == "NUEVO-1"
+    assert len(df) == 101
+    # La fila 103 de la planilla, índice 101
+    assert df.index[-1] == 101
+    assert copia.filas == 103
+    assert copia.ultima_fila == _hoja(libro)[102]
+
+
+def test_si_la_ultima_fila_cambio_se_relee_todo(libro, alm, copia):
+    copia.sincronizar(alm)
+    alm.borrar_filas("Sheet1", [10])
+    libro.llamadas.clear()
+
+    df = copia.sincronizar(alm)
+    assert libro.llamadas["read"] == 1
+    assert len(df) == 99
+    assert copia.filas == 100
+
+
+def test_columnas_nuevas_releen_todo(libro, alm, copia):
+    copia.sincronizar(alm)
+    alm.escribir_encabezados("Sheet1", _hoja(libro)[0] + ["Extra"])
+    alm.agregar_filas("Sheet1", [_fila(libro, "NUEVO-1") + ["x"]])
+    libro.llamadas.clear()
+
+    df = copia.sincronizar(alm)
+    assert libro.llamadas["read"] == 1
+    assert df["Extra"].iloc[-1] == "x"
+
+
+def test_recarga_completa_sin_cambios_conserva_la_version(libro, alm, copia, reloj):
+    primera = copia.sincronizar(alm)
+    reloj.ahora += copia.recarga_completa + 1
+    libro.llamadas.clear()
+
+    df = copia.sincronizar(alm)
+    assert libro.llamadas["read"] == 1
+    assert df is primera
+    assert copia.avisos == [("recarga", 100)]
+
+
+def test_recarga_completa_ve_ediciones_en_el_medio(libro, alm, copia, reloj):
+    version = copia.sincronizar(alm).attrs["version"]
+    _hoja(libro)[10][1] = "EDITADO"
+    libro.marca += 1
+    # El incremental no la ve: la última fila sigue igual
+    assert "EDITADO" not in _series(copia.sincronizar(alm))
+
+    reloj.ahora += copia.recarga_completa + 1
+    df = copia.sincronizar(alm)
+    assert df["Tag"].iloc[9] == "EDITADO"
+    assert df.attrs["version"] == version + 1
+
+
+def test_invalidar(libro, alm, copia):
+    copia.sincronizar(alm)
+    copia.invalidar()
+    libro.llamadas.clear()
+    copia.sincronizar(alm)
+    assert libro.llamadas["read"] == 1
+
+
+def test_no_incremental_relee_con_cada_cambio(libro, alm, reloj):
+    copia = CopiaHoja("Sheet1", incremental=False, reloj=reloj)
+    copia.sincronizar(alm)
+    alm.agregar_filas("Sheet1", [_fila(libro, "NUEVO-1")])
+    libro.llamadas.clear()
+    assert _series(copia.sincronizar(alm))[-1] == "NUEVO-1"
+    assert libro.llamadas["read"] == 1
+    assert libro.llamadas["get"] == 0
+
+
+def test_no_incremental_sin_cambios_no_baja_nada(libro, alm, reloj):
+    copia = CopiaHoja("Sheet1", incremental=False, reloj=reloj)
+    primera = copia.sincronizar(alm)
+    libro.llamadas.clear()
+    assert copia.sincronizar(alm) is primera
+    assert dict(libro.llamadas) == {"drive_last_update": 1}
+
+
+def test_no_incremental_cambio_en_otra_hoja_conserva_la_version(reloj):
+    # La marca de Sheets es del libro entero: un append en Sheet1 relee Planificación
+    libro = ConexionFalsa({"Sheet1": filas_sheet1(10), "Planificación": filas_sheet1(5)})
+    alm = almacenamiento.AlmacenGSheets(lambda: libro)
+    recargas = []
+    copia = CopiaHoja("Planificación", incremental=False, reloj=reloj, al_recargar=recargas.append)
+    primera = copia.sincronizar(alm)
+    alm.agregar_filas("Sheet1", [libro.hojas["Sheet1"].filas[1]])
+    assert copia.sincronizar(alm) is primera
+    assert len(recargas) == 1
+
+
+class SinConexion:
+    """Almacén que no responde: cada operación levanta ConnectionError."""
+
+    def __getattr__(self, operacion):
+        def fallar(*args, **kwargs):
+            raise ConnectionError(operacion)
+        return fallar
+
+
+def test_sin_conexion_sigue_con_la_ultima_copia(alm, copia):
+    primera = copia.sincronizar(alm)
+    assert copia.sincronizar(SinConexion()) is primera
+
+    with pytest.raises(ConnectionError):
+        CopiaHoja("Sheet1").sincronizar(SinConexion())
+
+
+def test_almacen_de_archivos(tmp_path, reloj):
+    alm = almacenamiento.AlmacenArchivos(str(tmp_path), "csv")
+    filas = filas_sheet1(20)
+    alm.agregar_filas("Sheet1", filas[:11] + [[""] * len(filas[0])] + filas[11:])
+    copia = CopiaHoja("Sheet1", reloj=reloj)
+
+    assert len(copia.sincronizar(alm)) == 20
+    assert len(alm.filas_desde("Sheet1", 2)) == 20
+
+    alm.agregar_filas("Sheet1", [filas[1]])
+    df = copia.sincronizar(alm)
+    assert len(df) == 21
+    assert df.index[-1] == 20